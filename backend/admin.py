@@ -0,0 +1,25 @@
+"""
+Admin authentication for operational endpoints
+"""
+import os
+import secrets
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException
+
+load_dotenv()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency guarding admin endpoints
+
+    Requests must send the ADMIN_TOKEN value in the X-Admin-Token header.
+    Admin endpoints are disabled entirely when ADMIN_TOKEN is not set.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=503, detail="Admin API is disabled (ADMIN_TOKEN not configured)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
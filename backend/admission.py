@@ -0,0 +1,209 @@
+"""
+SLO-driven admission control and graceful degradation
+
+Tracks in-flight work, queue wait and service time against a latency SLO and
+picks a degradation level for each admitted message. Under rising pressure
+stages are shed in order (LLM coaching/rewrite, LLM tone, BERT) before new
+work is rejected outright.
+"""
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class DegradationLevel(IntEnum):
+    """Processing levels, from full pipeline to rejecting work"""
+    FULL = 0              # All stages
+    NO_LLM_COACHING = 1   # Rule-based coaching and rewrite instead of the LLM
+    NO_LLM_TONE = 2       # ... and rule-based tone analysis
+    FAST_CLASSIFIER = 3   # ... and regex intent instead of the BERT toxicity model
+    REJECT = 4            # Shed load: 503 / backpressure frame
+
+    @property
+    def mode(self) -> str:
+        return self.name.lower()
+
+
+# Pressure (estimated latency / SLO, or in-flight / limit) at which each level starts
+PRESSURE_THRESHOLDS = [
+    (DegradationLevel.REJECT, 1.5),
+    (DegradationLevel.FAST_CLASSIFIER, 1.0),
+    (DegradationLevel.NO_LLM_TONE, 0.75),
+    (DegradationLevel.NO_LLM_COACHING, 0.5),
+]
+
+
+class Overloaded(Exception):
+    """Raised when a message is rejected by admission control"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Server is overloaded, please retry later")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admit or shed work based on in-flight count and latency against an SLO"""
+
+    def __init__(
+        self,
+        slo_ms: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        half_life: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize admission controller
+
+        Args:
+            slo_ms: Target end-to-end latency per message (env: ADMISSION_SLO_MS)
+            max_in_flight: Hard limit on queued + running messages (env: ADMISSION_MAX_IN_FLIGHT)
+            concurrency: Messages processed at once; the rest wait (env: ADMISSION_CONCURRENCY)
+            half_life: Seconds for latency estimates to decay by half while no work is outstanding
+            clock: Monotonic clock in seconds (injectable for synthetic load tests)
+        """
+        self.slo = (slo_ms or float(os.getenv("ADMISSION_SLO_MS", 2000))) / 1000
+        self.max_in_flight = max_in_flight or int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 64))
+        self.concurrency = concurrency or int(os.getenv("ADMISSION_CONCURRENCY", 8))
+        self.half_life = half_life
+        self.clock = clock
+
+        self.in_flight = 0
+        self.queue_wait = 0.0     # EWMA seconds
+        self.service_time = 0.0   # EWMA seconds
+        self._updated_at = clock()
+        # Queue time of each admitted, unfinished message (insertion order = oldest first)
+        self._outstanding: Dict[int, float] = {}
+        # Queue time of each message still waiting for a processing slot (oldest first)
+        self._waiting: Dict[int, float] = {}
+        self._next_token = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.level_counts = {level.mode: 0 for level in DegradationLevel}
+
+    # ------------------------------------------------------------------
+    # Policy
+    # ------------------------------------------------------------------
+
+    def _decay(self, now: float) -> float:
+        """
+        Decay factor so estimates recover once the server is idle
+
+        Nothing decays while work is outstanding: a stall (nothing
+        completing) must not look like recovery.
+        """
+        if self._outstanding:
+            return 1.0
+        elapsed = max(now - self._updated_at, 0.0)
+        return 0.5 ** (elapsed / self.half_life)
+
+    def _settle(self, now: float):
+        """Fold the idle-time decay into the estimates (before work starts)"""
+        decay = self._decay(now)
+        self.queue_wait *= decay
+        self.service_time *= decay
+        self._updated_at = now
+
+    def oldest_wait(self) -> float:
+        """Seconds the oldest message waiting for a processing slot has waited"""
+        if not self._waiting:
+            return 0.0
+        return max(self.clock() - next(iter(self._waiting.values())), 0.0)
+
+    def estimated_latency(self) -> float:
+        """Expected queue wait + service time (seconds) for new work"""
+        decay = self._decay(self.clock())
+        # All slots stuck: new work waits at least as long as the oldest waiting message.
+        # A slow message with slots still free does not delay anyone else.
+        return max((self.queue_wait + self.service_time) * decay, self.oldest_wait())
+
+    def pressure(self) -> float:
+        """Load relative to capacity: 1.0 means the SLO is about to be missed"""
+        # A full in-flight queue maps onto the REJECT threshold
+        return max(
+            self.estimated_latency() / self.slo,
+            self.in_flight / self.max_in_flight * 1.5
+        )
+
+    def level(self) -> DegradationLevel:
+        """Degradation level new work should run at"""
+        if self.in_flight >= self.max_in_flight:
+            return DegradationLevel.REJECT
+
+        pressure = self.pressure()
+        for level, threshold in PRESSURE_THRESHOLDS:
+            if pressure >= threshold:
+                return level
+        return DegradationLevel.FULL
+
+    def record(self, queue_wait: float, service_time: float, alpha: float = 0.2):
+        """Fold one completed message into the latency estimates"""
+        now = self.clock()
+        decay = self._decay(now)
+        self.queue_wait = (1 - alpha) * self.queue_wait * decay + alpha * queue_wait
+        self.service_time = (1 - alpha) * self.service_time * decay + alpha * service_time
+        self._updated_at = now
+
+    def retry_after(self) -> float:
+        """Suggested client back-off in seconds"""
+        return max(self.estimated_latency(), self.slo)
+
+    # ------------------------------------------------------------------
+    # Request lifecycle
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Admit one message and yield the DegradationLevel to process it at
+
+        Raises:
+            Overloaded: if the message is shed
+        """
+        level = self.level()
+        self.level_counts[level.mode] += 1
+        if level == DegradationLevel.REJECT:
+            raise Overloaded(self.retry_after())
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        queued_at = self.clock()
+        if not self._outstanding:
+            self._settle(queued_at)
+        token = self._next_token
+        self._next_token += 1
+        self._outstanding[token] = queued_at
+        self._waiting[token] = queued_at
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                del self._waiting[token]
+                started_at = self.clock()
+                try:
+                    yield level
+                finally:
+                    self.record(started_at - queued_at, self.clock() - started_at)
+        finally:
+            del self._outstanding[token]
+            self._waiting.pop(token, None)  # Cancelled while waiting
+            self.in_flight -= 1
+
+    def snapshot(self) -> dict:
+        """Current admission state for health checks"""
+        return {
+            "level": self.level().mode,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "slo_ms": round(self.slo * 1000, 1),
+            "estimated_latency_ms": round(self.estimated_latency() * 1000, 1),
+            "messages_by_level": dict(self.level_counts),
+        }
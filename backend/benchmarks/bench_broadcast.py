@@ -0,0 +1,103 @@
+"""
+Benchmark: CPU time per broadcast at increasing fan-out
+
+Compares the old per-client `send_json` encoding with encoding once per
+broadcast (JSON via the fast encoder, and the msgpack binary protocol).
+
+Run from the backend directory:
+    python benchmarks/bench_broadcast.py
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import EncodedMessage, msgpack  # noqa: E402
+
+
+PAYLOAD = {
+    "type": "message",
+    "username": "alice",
+    "message": "Honestly I think this is the worst idea anyone has had in this channel all week",
+    "is_toxic": False,
+    "toxicity_score": 0.214,
+    "timestamp": "2024-01-28T10:30:00.123456+00:00",
+    "analysis": {
+        "toxicity": {
+            "score": 0.214,
+            "is_toxic": False,
+            "categories": {
+                "toxic": 0.214, "severe_toxic": 0.003, "obscene": 0.011,
+                "threat": 0.002, "insult": 0.097, "identity_hate": 0.001,
+            },
+            "top_categories": [],
+        },
+        "intent": {"type": "disagreement", "confidence": 0.333},
+        "tone": {"type": "neutral", "confidence": 0.5},
+    },
+}
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; sending is a no-op"""
+
+    async def send_json(self, data):
+        # Same encoding Starlette's WebSocket.send_json performs per call
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    async def send_text(self, data):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+
+async def per_client_json(clients):
+    for ws in clients:
+        await ws.send_json(PAYLOAD)
+
+
+async def encode_once_json(clients):
+    encoded = EncodedMessage(PAYLOAD)
+    for ws in clients:
+        await ws.send_text(encoded.text())
+
+
+async def encode_once_msgpack(clients):
+    encoded = EncodedMessage(PAYLOAD)
+    for ws in clients:
+        await ws.send_bytes(encoded.binary())
+
+
+def measure(strategy, fan_out: int, rounds: int) -> float:
+    """Return CPU microseconds per broadcast"""
+    clients = [FakeWebSocket() for _ in range(fan_out)]
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(strategy(clients))  # warm up
+        start = time.process_time()
+        for _ in range(rounds):
+            loop.run_until_complete(strategy(clients))
+        return (time.process_time() - start) / rounds * 1e6
+    finally:
+        loop.close()
+
+
+def main():
+    strategies = [("send_json per client", per_client_json), ("encode once (json)", encode_once_json)]
+    if msgpack is not None:
+        strategies.append(("encode once (msgpack)", encode_once_msgpack))
+
+    print(f"{'fan-out':>8} | " + " | ".join(f"{name:>22}" for name, _ in strategies) + " | speedup")
+    for fan_out in (10, 100, 1000, 5000):
+        rounds = max(5, 20000 // fan_out)
+        timings = [measure(strategy, fan_out, rounds) for _, strategy in strategies]
+        cells = " | ".join(f"{t:>19.1f} us" for t in timings)
+        print(f"{fan_out:>8} | {cells} | {timings[0] / timings[1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
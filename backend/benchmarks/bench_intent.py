@@ -0,0 +1,103 @@
+"""
+Benchmark: regex vs learned intent classification
+
+Accuracy: the regex classifier is scored on every labelled message; the
+learned model is scored with stratified k-fold cross-validation, so each
+message is predicted by a model that never saw it.
+
+Throughput: messages/sec for the regex classifier, the learned model one
+message at a time, and the learned model in batches.
+
+Run from the backend directory:
+    python benchmarks/bench_intent.py [--data export.ndjson ...]
+"""
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_classifier import IntentClassifier  # noqa: E402
+from intent_model import LearnedIntentClassifier, load_training_data, train  # noqa: E402
+
+
+DEFAULT_DATA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "datasets", "intent_classification.csv"
+)
+
+
+def stratified_folds(labels, k: int):
+    """Assign each message to one of k folds, spreading every intent evenly"""
+    folds = [0] * len(labels)
+    seen = defaultdict(int)
+    for i, label in enumerate(labels):
+        folds[i] = seen[label] % k
+        seen[label] += 1
+    return folds
+
+
+def accuracy(predicted, labels) -> float:
+    return sum(p == label for p, label in zip(predicted, labels)) / len(labels)
+
+
+def cross_validate(texts, labels, k: int) -> float:
+    folds = stratified_folds(labels, k)
+    predicted = [None] * len(texts)
+    for fold in range(k):
+        train_idx = [i for i, f in enumerate(folds) if f != fold]
+        test_idx = [i for i, f in enumerate(folds) if f == fold]
+        model = train([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+        results = LearnedIntentClassifier(model).classify_batch([texts[i] for i in test_idx])
+        for i, (intent, _) in zip(test_idx, results):
+            predicted[i] = intent
+    return accuracy(predicted, labels)
+
+
+def throughput(classify, messages, batch_size: int = 0) -> float:
+    """Messages per second (batch_size 0 classifies one message per call)"""
+    start = time.perf_counter()
+    if batch_size:
+        for offset in range(0, len(messages), batch_size):
+            classify(messages[offset:offset + batch_size])
+    else:
+        for message in messages:
+            classify(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", action="append", help="Labelled dataset or /api/export file (repeatable)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=20000, help="Messages classified per throughput run")
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(args.data or [DEFAULT_DATA])
+    print(f"{len(texts)} labelled messages, {len(set(labels))} intents\n")
+
+    regex = IntentClassifier()
+    regex_accuracy = accuracy([regex.classify(text)[0] for text in texts], labels)
+    learned_accuracy = cross_validate(texts, labels, args.folds)
+    print(f"{'accuracy':<28} {'regex':>10} {'learned':>10}")
+    print(f"{'':<28} {regex_accuracy:>10.1%} {learned_accuracy:>10.1%}  ({args.folds}-fold CV)\n")
+
+    learned = LearnedIntentClassifier(train(texts, labels))
+    messages = (texts * (args.messages // len(texts) + 1))[:args.messages]
+    learned.classify_batch(messages[:256])  # warm up
+
+    runs = [
+        ("regex, per message", throughput(regex.classify, messages)),
+        ("learned, per message", throughput(learned.classify, messages)),
+    ]
+    for batch_size in (32, 256, 4096):
+        runs.append((f"learned, batch of {batch_size}", throughput(learned.classify_batch, messages, batch_size)))
+
+    print(f"{'throughput':<28} {'msgs/sec':>10} {'vs regex':>10}")
+    for name, rate in runs:
+        print(f"{name:<28} {rate:>10,.0f} {rate / runs[0][1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Synthetic load test for the admission controller
+
+Drives AdmissionController.admit() with Poisson arrivals at increasing rates.
+Each admitted message "runs" for a service time that depends on its
+degradation level, so shedding stages visibly lowers latency. Time is scaled
+down (SLO of 20 ms) so the whole run takes a few seconds.
+
+Run from the backend directory:
+    python benchmarks/simulate_admission.py
+"""
+import os
+import sys
+import random
+import asyncio
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, DegradationLevel, Overloaded  # noqa: E402
+
+
+SLO_MS = 20
+CONCURRENCY = 8
+# Per-message service time (ms) at each level: LLM coaching+tone, LLM tone, BERT, regex only
+SERVICE_MS = {
+    DegradationLevel.FULL: 15.0,
+    DegradationLevel.NO_LLM_COACHING: 8.0,
+    DegradationLevel.NO_LLM_TONE: 1.5,
+    DegradationLevel.FAST_CLASSIFIER: 0.2,
+}
+PHASES = [(100, 1.5), (600, 1.5), (2000, 1.5), (6000, 1.5), (100, 1.5)]  # (messages/sec, seconds)
+
+
+async def one_message(controller: AdmissionController, levels: Counter, latencies: list):
+    loop = asyncio.get_running_loop()
+    arrived = loop.time()
+    try:
+        async with controller.admit() as level:
+            await asyncio.sleep(SERVICE_MS[level] * random.uniform(0.8, 1.2) / 1000)
+    except Overloaded:
+        levels[DegradationLevel.REJECT] += 1
+        return
+    levels[level] += 1
+    latencies.append((loop.time() - arrived) * 1000)
+
+
+async def run_phase(controller: AdmissionController, rate: float, duration: float):
+    levels: Counter = Counter()
+    latencies: list = []
+    tasks = []
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    while loop.time() < end:
+        tasks.append(asyncio.create_task(one_message(controller, levels, latencies)))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return levels, latencies
+
+
+async def main():
+    random.seed(7)
+    controller = AdmissionController(
+        slo_ms=SLO_MS, max_in_flight=64, concurrency=CONCURRENCY, half_life=0.05
+    )
+    names = [level.mode for level in DegradationLevel]
+    print(f"SLO {SLO_MS} ms, concurrency {CONCURRENCY}")
+    print(f"{'rate/s':>7} | {'p50 ms':>7} | {'p99 ms':>7} | " + " | ".join(f"{n:>15}" for n in names))
+    for rate, duration in PHASES:
+        levels, latencies = await run_phase(controller, rate, duration)
+        total = sum(levels.values()) or 1
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) >= 100 else max(latencies, default=0.0)
+        shares = " | ".join(f"{levels[level] / total:>14.0%} " for level in DegradationLevel)
+        print(f"{rate:>7} | {p50:>7.1f} | {p99:>7.1f} | {shares}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,12 +2,15 @@
 Database configuration and session management
 """
 import os
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateTable
 from dotenv import load_dotenv
-from models import Base
+from models import Base, ChatMessage
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 # Get database URL from environment (default to SQLite for simplicity)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./chat_moderation.db")
@@ -27,10 +30,64 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
     """Initialize database - create all tables"""
+    if engine.dialect.name == "sqlite":
+        _migrate_sqlite_autoincrement()
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so indexes added to the models later
+    # (e.g. chat_messages.timestamp) are created here
+    with engine.begin() as conn:
+        for index in ChatMessage.__table__.indexes:
+            index.create(conn, checkfirst=True)
     print("✅ Database tables created successfully!")
 
 
+def _migrate_sqlite_autoincrement():
+    """
+    Rebuild chat_messages with AUTOINCREMENT if it was created without it
+
+    Without AUTOINCREMENT SQLite reuses the highest ids once their rows are
+    deleted (e.g. archived by retention). Rows keep their ids.
+    """
+    table = ChatMessage.__table__
+    with engine.begin() as conn:
+        ddl = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": table.name}
+        ).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return
+
+        migrated = f"{table.name}_migrated"
+        create = str(CreateTable(table).compile(dialect=conn.dialect))
+        conn.execute(text(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {migrated} ", 1)))
+        columns = ", ".join(column.name for column in table.columns)
+        conn.execute(text(f"INSERT INTO {migrated} ({columns}) SELECT {columns} FROM {table.name}"))
+        # Also drops the old indexes and triggers; both are recreated at startup
+        conn.execute(text(f"DROP TABLE {table.name}"))
+        conn.execute(text(f"ALTER TABLE {migrated} RENAME TO {table.name}"))
+    logger.info(f"✅ Migrated {table.name} to AUTOINCREMENT ids")
+
+
+def reserve_message_ids(last_id: int):
+    """Make sure new messages get ids above last_id (e.g. the highest archived id)"""
+    if engine.dialect.name != "sqlite" or last_id <= 0:
+        return  # PostgreSQL sequences never hand out an id twice
+    with engine.begin() as conn:
+        current = conn.execute(
+            text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": ChatMessage.__tablename__}
+        ).scalar()
+        if current is None:
+            conn.execute(
+                text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                {"name": ChatMessage.__tablename__, "seq": last_id}
+            )
+        elif current < last_id:
+            conn.execute(
+                text("UPDATE sqlite_sequence SET seq = :seq WHERE name = :name"),
+                {"name": ChatMessage.__tablename__, "seq": last_id}
+            )
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
@@ -0,0 +1,252 @@
+"""
+Streaming export of moderation data (NDJSON, CSV, Parquet)
+
+Rows are read with a server-side cursor in fixed-size batches and encoded
+chunk by chunk, so memory use does not depend on the size of the export.
+"""
+import io
+import os
+import csv
+import json
+import logging
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from models import ChatMessage, naive_utc
+from retention import RetentionManager, message_schema, message_to_record
+from serialization import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_COLUMNS = [
+    "id", "username", "message", "toxicity_score", "is_toxic", "toxic_categories",
+    "intent", "intent_confidence", "tone", "tone_confidence",
+    "coaching_message", "suggested_rewrite", "timestamp", "room_id",
+]
+
+
+class _ChunkSink:
+    """Minimal writable file object that hands written bytes back as chunks"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks = []
+        return chunk
+
+
+class MessageExporter:
+    """Stream filtered ChatMessage history in a chosen format"""
+
+    def __init__(
+        self,
+        session_factory,
+        retention_manager: Optional[RetentionManager] = None,
+        batch_size: Optional[int] = None,
+    ):
+        """
+        Initialize exporter
+
+        Args:
+            session_factory: Callable returning a new database session
+            retention_manager: Used to include archived messages in exports
+            batch_size: Rows fetched and encoded per chunk (env: EXPORT_BATCH_SIZE)
+        """
+        self.session_factory = session_factory
+        self.retention_manager = retention_manager
+        self.batch_size = batch_size or int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    def stream(
+        self,
+        export_format: str = "ndjson",
+        room_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        min_toxicity: Optional[float] = None,
+        max_toxicity: Optional[float] = None,
+        is_toxic: Optional[bool] = None,
+        intent: Optional[str] = None,
+        include_archive: bool = False,
+    ) -> Iterator[bytes]:
+        """
+        Yield encoded chunks for all matching messages
+
+        Archived messages (if requested) come first, followed by the hot
+        window from the database in id order.
+        """
+        filters = dict(
+            room_id=room_id, start=naive_utc(start), end=naive_utc(end),
+            min_toxicity=min_toxicity, max_toxicity=max_toxicity,
+            is_toxic=is_toxic, intent=intent,
+        )
+
+        def batches():
+            if include_archive:
+                yield from self._archive_batches(**filters)
+            yield from self._db_batches(**filters)
+
+        def coalesced():
+            # Archive fragments are small (one per day/room file); regroup so every
+            # chunk (and Parquet row group) holds up to batch_size rows
+            pending: List[dict] = []
+            for records in batches():
+                pending.extend(records)
+                while len(pending) >= self.batch_size:
+                    yield pending[:self.batch_size]
+                    pending = pending[self.batch_size:]
+            if pending:
+                yield pending
+
+        if export_format == "ndjson":
+            return self._encode_ndjson(coalesced())
+        if export_format == "csv":
+            return self._encode_csv(coalesced())
+        if export_format == "parquet":
+            return self._encode_parquet(coalesced())
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    # ------------------------------------------------------------------
+    # Sources (each batch is a list of archive-style records)
+    # ------------------------------------------------------------------
+
+    def _db_batches(self, room_id, start, end, min_toxicity, max_toxicity, is_toxic, intent) -> Iterator[List[dict]]:
+        query = select(ChatMessage.__table__)
+        if room_id is not None:
+            query = query.where(ChatMessage.room_id == room_id)
+        if start is not None:
+            query = query.where(ChatMessage.timestamp >= start)
+        if end is not None:
+            query = query.where(ChatMessage.timestamp < end)
+        if min_toxicity is not None:
+            query = query.where(ChatMessage.toxicity_score >= min_toxicity)
+        if max_toxicity is not None:
+            query = query.where(ChatMessage.toxicity_score <= max_toxicity)
+        if is_toxic is not None:
+            query = query.where(ChatMessage.is_toxic == int(is_toxic))
+        if intent is not None:
+            query = query.where(ChatMessage.intent == intent)
+        query = query.order_by(ChatMessage.id)
+
+        db = self.session_factory()
+        try:
+            result = db.execute(query.execution_options(stream_results=True, yield_per=self.batch_size))
+            for rows in result.partitions():
+                yield [message_to_record(row) for row in rows]
+        finally:
+            db.close()
+
+    def _archive_batches(self, room_id, start, end, min_toxicity, max_toxicity, is_toxic, intent) -> Iterator[List[dict]]:
+        if self.retention_manager is None:
+            return
+        dataset = self.retention_manager.dataset()
+        if dataset is None:
+            return
+
+        expression = self.retention_manager.partition_filter(
+            room_id,
+            start.date() if start else None,
+            end.date() if end else None,
+        )
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us")))
+        if end is not None:
+            conditions.append(ds.field("timestamp") < pa.scalar(end, pa.timestamp("us")))
+        if min_toxicity is not None:
+            conditions.append(ds.field("toxicity_score") >= min_toxicity)
+        if max_toxicity is not None:
+            conditions.append(ds.field("toxicity_score") <= max_toxicity)
+        if is_toxic is not None:
+            conditions.append(ds.field("is_toxic") == int(is_toxic))
+        if intent is not None:
+            conditions.append(ds.field("intent") == intent)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        for batch in dataset.to_batches(columns=EXPORT_COLUMNS, filter=expression, batch_size=self.batch_size):
+            if batch.num_rows:
+                yield batch.to_pylist()
+
+    # ------------------------------------------------------------------
+    # Encoders
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_ndjson(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+        for records in batches:
+            lines = []
+            for record in records:
+                record = dict(record)
+                record["is_toxic"] = bool(record["is_toxic"])
+                record["toxic_categories"] = json.loads(record["toxic_categories"] or "{}")
+                record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+                lines.append(dumps(record))
+            yield b"\n".join(lines) + b"\n"
+
+    @staticmethod
+    def _encode_csv(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for records in batches:
+            for record in records:
+                record = dict(record)
+                record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+                writer.writerow(record)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _encode_parquet(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+        schema = message_schema()
+        sink = _ChunkSink()
+        # Each batch becomes one row group; its bytes are yielded as soon as it is written
+        with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+            for records in batches:
+                writer.write_table(pa.Table.from_pylist(records, schema=schema))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
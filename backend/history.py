@@ -0,0 +1,114 @@
+"""
+In-memory per-room ring buffer of recent messages
+
+Serves message history and reconnect replay from memory. Each room's buffer
+holds its most recent messages (serialized with ChatMessage.to_dict). A room
+is loaded from the database on first read; after that, processed messages
+are appended and deleted ones removed. Requests reaching further back than
+the buffer fall through to the database.
+"""
+import os
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from models import ChatMessage
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class MessageHistory:
+    """Bounded per-room buffers of the latest serialized messages"""
+
+    def __init__(self, capacity: Optional[int] = None):
+        """
+        Initialize message history
+
+        Args:
+            capacity: Messages kept per room (env: HISTORY_BUFFER_SIZE)
+        """
+        self.capacity = capacity or int(os.getenv("HISTORY_BUFFER_SIZE", 200))
+        self.rooms: Dict[str, Deque[dict]] = {}
+        # Rooms whose buffer holds every message the room has (nothing evicted yet)
+        self._complete: Set[str] = set()
+
+    def _buffer(self, db: Session, room_id: str) -> Deque[dict]:
+        """Return the room's buffer, loading it from the database on first use"""
+        buffer = self.rooms.get(room_id)
+        if buffer is None:
+            rows = db.query(ChatMessage)\
+                .filter(ChatMessage.room_id == room_id)\
+                .order_by(ChatMessage.id.desc())\
+                .limit(self.capacity)\
+                .all()
+            buffer = deque((row.to_dict() for row in reversed(rows)), maxlen=self.capacity)
+            self.rooms[room_id] = buffer
+            if len(rows) < self.capacity:
+                self._complete.add(room_id)
+        return buffer
+
+    def append(self, message: dict):
+        """
+        Add a just-processed message (in to_dict form)
+
+        Rooms that were never read are skipped; they load from the database
+        (including this message) on first read.
+        """
+        room_id = message["room_id"]
+        buffer = self.rooms.get(room_id)
+        if buffer is None:
+            return
+        if len(buffer) == buffer.maxlen:
+            self._complete.discard(room_id)
+        buffer.append(message)
+
+    def remove(self, message_id: int, room_id: Optional[str] = None) -> bool:
+        """Drop a deleted message from the buffer. Returns True if it was buffered."""
+        rooms = [room_id] if room_id is not None else list(self.rooms)
+        for room in rooms:
+            buffer = self.rooms.get(room)
+            if not buffer:
+                continue
+            for message in buffer:
+                if message["id"] == message_id:
+                    buffer.remove(message)
+                    return True
+        return False
+
+    def latest(self, db: Session, room_id: str, limit: int) -> List[dict]:
+        """Latest `limit` messages of a room, oldest first"""
+        buffer = self._buffer(db, room_id)
+        if limit <= len(buffer) or room_id in self._complete:
+            return list(buffer)[-limit:] if limit > 0 else []
+
+        rows = db.query(ChatMessage)\
+            .filter(ChatMessage.room_id == room_id)\
+            .order_by(ChatMessage.id.desc())\
+            .limit(limit)\
+            .all()
+        return [row.to_dict() for row in reversed(rows)]
+
+    def since(self, db: Session, room_id: str, after_id: int, limit: int) -> Tuple[List[dict], bool]:
+        """
+        Messages of a room with id > after_id, oldest first
+
+        Returns:
+            Tuple of (messages, has_more) where has_more means more than
+            `limit` messages followed after_id
+        """
+        buffer = self._buffer(db, room_id)
+        covered = room_id in self._complete or (buffer and buffer[0]["id"] <= after_id)
+        if covered:
+            newer = [message for message in buffer if message["id"] > after_id]
+            return newer[:limit], len(newer) > limit
+
+        rows = db.query(ChatMessage)\
+            .filter(ChatMessage.room_id == room_id, ChatMessage.id > after_id)\
+            .order_by(ChatMessage.id)\
+            .limit(limit + 1)\
+            .all()
+        return [row.to_dict() for row in rows[:limit]], len(rows) > limit
@@ -2,7 +2,7 @@
 Intent classification module
 """
 import re
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -102,7 +102,11 @@ class IntentClassifier:
         
         # Default to neutral
         return "neutral", 0.5
-    
+
+    def classify_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Classify several messages (one at a time for the regex engine)"""
+        return [self.classify(text) for text in texts]
+
     def get_intent_explanation(self, intent: str) -> str:
         """Get human-readable explanation for intent"""
         explanations = {
@@ -0,0 +1,340 @@
+"""
+Learned intent classification with hashed character n-grams
+
+An alternative to the regex scoring in intent_classifier: messages are
+turned into L2-normalized counts of hashed character n-grams, and a linear
+(softmax) model scores all intents at once. A batch of messages is
+vectorized with numpy and classified with a single sparse matrix product.
+
+Train a model from the labelled dataset plus exported history (run from the
+backend directory):
+    python intent_model.py --data ../datasets/intent_classification.csv \\
+        --data messages.ndjson --output models/intent_model.npz
+
+then set INTENT_ENGINE=learned to serve it.
+"""
+import os
+import csv
+import logging
+import argparse
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from intent_classifier import IntentClassifier
+from serialization import loads
+
+try:
+    import numpy as np
+    import scipy.sparse as sp
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pq = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MODEL_PATH = "./models/intent_model.npz"
+
+# Polynomial rolling hash over code points (uint64 arithmetic wraps), then
+# Fibonacci hashing to pick a bucket. Unlike hash(), stable across processes.
+_HASH_BASE = 1_000_003
+_HASH_MIX = 0x9E3779B97F4A7C15
+
+
+class HashedNgramVectorizer:
+    """Map texts to L2-normalized hashed character n-gram counts"""
+
+    def __init__(self, hash_bits: int = 18, ngram_range: Tuple[int, int] = (2, 4)):
+        """
+        Initialize vectorizer
+
+        Args:
+            hash_bits: log2 of the number of feature buckets
+            ngram_range: Smallest and largest n-gram length (both at least 1)
+        """
+        if not 1 <= ngram_range[0] <= ngram_range[1]:
+            raise ValueError(f"Invalid ngram_range {ngram_range}")
+        self.hash_bits = hash_bits
+        self.n_features = 1 << hash_bits
+        self.ngram_range = ngram_range
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase, collapse whitespace and pad so n-grams see word boundaries"""
+        return " " + " ".join(text.lower().split()) + " "
+
+    def hash_features(self, texts: Sequence[str]):
+        """
+        Hashed n-gram features as sorted coordinates
+
+        Returns:
+            Tuple of (rows, cols, values) in CSR order, with duplicate
+            n-grams summed and each row L2-normalized
+        """
+        docs = [self.normalize(text) for text in texts]
+        lengths = np.fromiter((len(doc) for doc in docs), dtype=np.int64, count=len(docs))
+        codes = np.frombuffer("".join(docs).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        # Row (document) of every character in the concatenated batch
+        doc_ids = np.repeat(np.arange(len(docs)), lengths)
+
+        rows, cols = [], []
+        shift = np.uint64(64 - self.hash_bits)
+        hashes = codes
+        with np.errstate(over="ignore"):
+            # The hash of each n-gram extends the hash of its (n-1)-gram prefix;
+            # unigrams hash to their code point
+            for n in range(1, self.ngram_range[1] + 1):
+                if n > 1:
+                    hashes = hashes[:-1] * np.uint64(_HASH_BASE) + codes[n - 1:]
+                if n < self.ngram_range[0]:
+                    continue
+                starts = doc_ids[:len(hashes)]
+                # Keep only n-grams that do not straddle two documents
+                inside = starts == doc_ids[n - 1:]
+                rows.append(starts[inside])
+                cols.append(((hashes[inside] + np.uint64(n)) * np.uint64(_HASH_MIX)) >> shift)
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols).astype(np.int64) if cols else np.empty(0, dtype=np.int64)
+        # Sorting (row, col) keys gives CSR order; duplicates become counts
+        keys, counts = np.unique(rows * self.n_features + cols, return_counts=True)
+        rows = keys // self.n_features
+        values = counts.astype(np.float32)
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(docs)))
+        norms[norms == 0] = 1.0
+        values /= norms[rows].astype(np.float32)
+        return rows, keys % self.n_features, values
+
+    def transform(self, texts: Sequence[str]):
+        """Vectorize a batch of texts into a CSR matrix (one row per text)"""
+        rows, cols, values = self.hash_features(texts)
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(texts)), out=indptr[1:])
+        return sp.csr_matrix((values, cols, indptr), shape=(len(texts), self.n_features))
+
+
+class LinearIntentModel:
+    """Multinomial logistic regression over hashed n-gram features"""
+
+    def __init__(self, classes: Sequence[str], vectorizer: HashedNgramVectorizer):
+        self.classes = list(classes)
+        self.vectorizer = vectorizer
+        self.weights = np.zeros((vectorizer.n_features, len(self.classes)), dtype=np.float32)
+        self.bias = np.zeros(len(self.classes), dtype=np.float32)
+
+    def predict_proba(self, texts: Sequence[str]):
+        """Class probabilities for a batch, shape (len(texts), len(classes))"""
+        if len(texts) == 1:
+            # Same row product without building a sparse matrix (per-message path)
+            _, cols, values = self.vectorizer.hash_features(texts)
+            scores = (values @ self.weights[cols] + self.bias)[np.newaxis, :]
+        else:
+            scores = self.vectorizer.transform(texts) @ self.weights + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        epochs: int = 200,
+        batch_size: int = 256,
+        learning_rate: float = 0.05,
+        l2: float = 1e-4,
+        seed: int = 0,
+    ) -> "LinearIntentModel":
+        """
+        Train with mini-batch Adam on the softmax cross-entropy loss
+
+        Updates are lazy: each step only touches the weight rows of features
+        present in the batch, so a step costs O(batch nnz), not O(n_features).
+        """
+        index = {intent: i for i, intent in enumerate(self.classes)}
+        features = self.vectorizer.transform(texts)
+        targets = np.zeros((len(labels), len(self.classes)), dtype=np.float32)
+        targets[np.arange(len(labels)), [index[label] for label in labels]] = 1.0
+
+        rng = np.random.default_rng(seed)
+        weight_m, weight_v = np.zeros_like(self.weights), np.zeros_like(self.weights)
+        bias_m, bias_v = np.zeros_like(self.bias), np.zeros_like(self.bias)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = 0
+
+        for _ in range(epochs):
+            order = rng.permutation(len(labels))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                x, y = features[batch], targets[batch]
+                touched = np.unique(x.indices)
+
+                scores = x @ self.weights + self.bias
+                scores -= scores.max(axis=1, keepdims=True)
+                probs = np.exp(scores)
+                probs /= probs.sum(axis=1, keepdims=True)
+                error = (probs - y) / len(batch)
+
+                step += 1
+                lr = learning_rate * np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+                for param, grad, m, v, rows in (
+                    (self.weights, x[:, touched].T @ error + l2 * self.weights[touched],
+                     weight_m, weight_v, touched),
+                    (self.bias, error.sum(axis=0), bias_m, bias_v, slice(None)),
+                ):
+                    m[rows] = beta1 * m[rows] + (1 - beta1) * grad
+                    v[rows] = beta2 * v[rows] + (1 - beta2) * grad * grad
+                    param[rows] -= (lr * m[rows] / (np.sqrt(v[rows]) + eps)).astype(np.float32)
+        return self
+
+    def save(self, path: str):
+        """Persist weights and vectorizer settings to an .npz file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights,
+                bias=self.bias,
+                classes=np.array(self.classes),
+                hash_bits=self.vectorizer.hash_bits,
+                ngram_range=np.array(self.vectorizer.ngram_range),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "LinearIntentModel":
+        with np.load(path, allow_pickle=False) as data:
+            vectorizer = HashedNgramVectorizer(int(data["hash_bits"]), tuple(int(n) for n in data["ngram_range"]))
+            model = cls([str(c) for c in data["classes"]], vectorizer)
+            model.weights = data["weights"].astype(np.float32)
+            model.bias = data["bias"].astype(np.float32)
+        return model
+
+
+class LearnedIntentClassifier(IntentClassifier):
+    """IntentClassifier backed by a trained LinearIntentModel"""
+
+    def __init__(self, model: "LinearIntentModel"):
+        super().__init__()
+        self.model = model
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "LearnedIntentClassifier":
+        """
+        Load a trained model
+
+        Args:
+            path: Model file (env: INTENT_MODEL_PATH)
+        """
+        if np is None:
+            raise ImportError("numpy and scipy are required for the learned intent model")
+        path = path or os.getenv("INTENT_MODEL_PATH", DEFAULT_MODEL_PATH)
+        model = LinearIntentModel.load(path)
+        logger.info(f"✅ Learned intent model loaded from {path} ({len(model.classes)} intents)")
+        return cls(model)
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Classify intent of the message (see classify_batch)"""
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """Classify a batch of messages with one sparse matrix product"""
+        if not texts:
+            return []
+        probs = self.model.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        return [
+            (self.model.classes[i], float(probs[row, i])) if text.strip() else ("neutral", 0.5)
+            for row, (text, i) in enumerate(zip(texts, best))
+        ]
+
+
+# ----------------------------------------------------------------------
+# Training data
+# ----------------------------------------------------------------------
+
+def _read_csv(path: str) -> Iterable[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        # The bundled datasets start with '#' comment lines and a blank line
+        yield from csv.DictReader(line for line in f if line.strip() and not line.startswith("#"))
+
+
+def _read_ndjson(path: str) -> Iterable[dict]:
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def _read_parquet(path: str) -> Iterable[dict]:
+    if pq is None:
+        raise ImportError("pyarrow is required to read Parquet exports")
+    yield from pq.read_table(path, columns=["message", "intent"]).to_pylist()
+
+
+def load_training_data(paths: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """
+    Read (message, intent) pairs from datasets and /api/export files
+
+    Supports CSV (the datasets/ format or a CSV export), NDJSON and Parquet
+    exports. Rows without a message or intent are skipped.
+    """
+    texts, labels = [], []
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".parquet":
+            rows = _read_parquet(path)
+        elif extension in (".ndjson", ".jsonl", ".json"):
+            rows = _read_ndjson(path)
+        else:
+            rows = _read_csv(path)
+
+        for row in rows:
+            message, intent = row.get("message"), row.get("intent")
+            if message and intent:
+                texts.append(message)
+                labels.append(intent.strip())
+    return texts, labels
+
+
+def train(
+    texts: Sequence[str],
+    labels: Sequence[str],
+    hash_bits: int = 18,
+    ngram_range: Tuple[int, int] = (2, 4),
+    **fit_options,
+) -> LinearIntentModel:
+    """Train an intent model on labelled messages"""
+    model = LinearIntentModel(sorted(set(labels)), HashedNgramVectorizer(hash_bits, ngram_range))
+    return model.fit(texts, labels, **fit_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the learned intent model")
+    parser.add_argument("--data", action="append", required=True,
+                        help="Labelled CSV dataset or /api/export file (repeatable)")
+    parser.add_argument("--output", default=os.getenv("INTENT_MODEL_PATH", DEFAULT_MODEL_PATH))
+    parser.add_argument("--hash-bits", type=int, default=18)
+    parser.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    texts, labels = load_training_data(args.data)
+    if not texts:
+        parser.error("no labelled messages found")
+
+    model = train(texts, labels, hash_bits=args.hash_bits, epochs=args.epochs)
+    predicted = [model.classes[i] for i in model.predict_proba(texts).argmax(axis=1)]
+    accuracy = sum(p == label for p, label in zip(predicted, labels)) / len(labels)
+    model.save(args.output)
+    logger.info(f"✅ Trained on {len(texts)} messages ({len(model.classes)} intents), "
+                f"training accuracy {accuracy:.1%}, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
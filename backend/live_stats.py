@@ -0,0 +1,272 @@
+"""
+Live moderation statistics with a push channel
+
+Counters (totals, toxic count, intent and tone mix) are kept in memory per
+room and updated as messages are processed or deleted, so reading the stats
+never aggregates the message table. Dashboards subscribe to a room (or to all
+rooms) and receive one full snapshot, then counter deltas. Changes are
+coalesced and pushed at most once per interval; nothing is sent while
+nothing changes.
+
+All methods run on the event loop thread.
+"""
+import os
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import ChatMessage
+from reputation import ALL_ROOMS
+from serialization import dumps
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Comment frame sent to idle subscribers so proxies keep the stream open
+KEEPALIVE_FRAME = b": keepalive\n\n"
+KEEPALIVE_SECONDS = 15.0
+
+
+class RoomStats:
+    """Message counters for one room (or a delta of them)"""
+
+    __slots__ = ("total", "toxic", "intents", "tones")
+
+    def __init__(self):
+        self.total = 0
+        self.toxic = 0
+        self.intents: Counter = Counter()
+        self.tones: Counter = Counter()
+
+    def add(self, is_toxic: bool, intent: Optional[str], tone: Optional[str], count: int = 1):
+        self.total += count
+        self.toxic += count if is_toxic else 0
+        if intent:
+            self.intents[intent] += count
+        if tone:
+            self.tones[tone] += count
+
+    def minus(self, other: "RoomStats") -> "RoomStats":
+        """Counters with another set of changes taken back out"""
+        result = RoomStats()
+        result.total = self.total - other.total
+        result.toxic = self.toxic - other.toxic
+        result.intents = Counter(self.intents)
+        result.intents.subtract(other.intents)
+        result.tones = Counter(self.tones)
+        result.tones.subtract(other.tones)
+        return result
+
+    @property
+    def toxicity_rate(self) -> float:
+        return round(self.toxic / self.total * 100, 2) if self.total > 0 else 0
+
+    def to_dict(self) -> dict:
+        return {
+            "total_messages": self.total,
+            "toxic_messages": self.toxic,
+            "clean_messages": self.total - self.toxic,
+            "toxicity_rate": self.toxicity_rate,
+            "intents": {intent: count for intent, count in self.intents.items() if count > 0},
+            "tones": {tone: count for tone, count in self.tones.items() if count > 0},
+        }
+
+    def changes(self) -> dict:
+        """Non-zero counter changes, for a delta frame"""
+        changes = {}
+        if self.total:
+            changes["total_messages"] = self.total
+        if self.toxic:
+            changes["toxic_messages"] = self.toxic
+        # Checked on its own: +1 toxic and -1 clean nets total to 0
+        if self.total - self.toxic:
+            changes["clean_messages"] = self.total - self.toxic
+        intents = {intent: count for intent, count in self.intents.items() if count}
+        if intents:
+            changes["intents"] = intents
+        tones = {tone: count for tone, count in self.tones.items() if count}
+        if tones:
+            changes["tones"] = tones
+        return changes
+
+
+class StatsSubscription:
+    """One subscriber's queue of encoded frames"""
+
+    def __init__(self, room_id: str, max_queued: int):
+        self.room_id = room_id
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=max_queued)
+        # Set when a frame had to be dropped; the subscriber then resyncs from a snapshot
+        self.overflowed = False
+
+    def push(self, frame: bytes):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class LiveStats:
+    """In-memory moderation counters with coalesced pushes to subscribers"""
+
+    def __init__(self, interval_ms: Optional[int] = None, max_queued: int = 16):
+        """
+        Initialize live stats
+
+        Args:
+            interval_ms: Minimum time between pushes (env: STATS_PUSH_INTERVAL_MS)
+            max_queued: Frames a slow subscriber may fall behind before it is resynced
+        """
+        self.interval = (interval_ms or int(os.getenv("STATS_PUSH_INTERVAL_MS", 1000))) / 1000
+        self.max_queued = max_queued
+        self.seq = 0
+        self.active_connections = 0
+
+        self.rooms: Dict[str, RoomStats] = {ALL_ROOMS: RoomStats()}
+        # Changes not yet pushed, keyed like self.rooms
+        self._pending: Dict[str, RoomStats] = {}
+        self._connections_changed = False
+        self.subscribers: Dict[str, Set[StatsSubscription]] = {}
+
+    # ------------------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------------------
+
+    def load(self, db: Session, retention_manager=None):
+        """Initialize counters from the database and the archive (once, at startup)"""
+        groups = db.query(
+            ChatMessage.room_id,
+            ChatMessage.intent,
+            ChatMessage.tone,
+            ChatMessage.is_toxic,
+            func.count(ChatMessage.id)
+        ).group_by(ChatMessage.room_id, ChatMessage.intent, ChatMessage.tone, ChatMessage.is_toxic).all()
+        if retention_manager is not None:
+            groups += retention_manager.message_counts()
+
+        for room_id, intent, tone, is_toxic, count in groups:
+            for room in (ALL_ROOMS, room_id):
+                self.rooms.setdefault(room, RoomStats()).add(bool(is_toxic), intent, tone, count)
+        logger.info(f"✅ Loaded live stats: {self.rooms[ALL_ROOMS].total} messages in {len(self.rooms) - 1} rooms")
+
+    def record(self, room_id: str, is_toxic: bool, intent: Optional[str], tone: Optional[str], count: int = 1):
+        """Count a processed message (count=-1 un-counts a deleted one)"""
+        for room in (ALL_ROOMS, room_id):
+            self.rooms.setdefault(room, RoomStats()).add(is_toxic, intent, tone, count)
+            self._pending.setdefault(room, RoomStats()).add(is_toxic, intent, tone, count)
+
+    def remove(self, message: dict):
+        """Un-count a deleted message (in ChatMessage.to_dict form)"""
+        self.record(message["room_id"], message["is_toxic"], message["intent"], message["tone"], count=-1)
+
+    def set_active_connections(self, count: int):
+        if count != self.active_connections:
+            self.active_connections = count
+            self._connections_changed = True
+
+    def snapshot(self, room_id: str = ALL_ROOMS, flushed: bool = False) -> dict:
+        """
+        Current stats for a room (same shape as GET /api/stats)
+
+        With flushed=True, changes not yet pushed are left out: they reach
+        subscribers in the next stats_delta.
+        """
+        stats = self.rooms.get(room_id) or RoomStats()
+        if flushed and room_id in self._pending:
+            stats = stats.minus(self._pending[room_id])
+        return {**stats.to_dict(), "active_connections": self.active_connections}
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, room_id: str = ALL_ROOMS) -> StatsSubscription:
+        subscription = StatsSubscription(room_id, self.max_queued)
+        self.subscribers.setdefault(room_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StatsSubscription):
+        subscribers = self.subscribers.get(subscription.room_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.room_id]
+
+    @staticmethod
+    def encode(frame: dict) -> bytes:
+        """Encode a frame as a server-sent event"""
+        return b"data: " + dumps(frame) + b"\n\n"
+
+    def snapshot_frame(self, room_id: str) -> bytes:
+        return self.encode({
+            "type": "stats_snapshot",
+            "room_id": None if room_id == ALL_ROOMS else room_id,
+            # The next stats_delta (seq + 1) applies on top of this snapshot
+            "seq": self.seq,
+            "stats": self.snapshot(room_id, flushed=True),
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def next_frame(self, subscription: StatsSubscription, timeout: float = KEEPALIVE_SECONDS) -> Optional[bytes]:
+        """
+        Wait for the subscriber's next frame (None if nothing arrived within timeout)
+
+        A subscriber that fell behind gets a fresh snapshot instead of the
+        deltas it missed.
+        """
+        if subscription.overflowed:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.overflowed = False
+            return self.snapshot_frame(subscription.room_id)
+        try:
+            return await asyncio.wait_for(subscription.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def flush(self) -> int:
+        """Push coalesced changes to subscribers. Returns the number of frames queued."""
+        if not self._pending and not self._connections_changed:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        connections_changed, self._connections_changed = self._connections_changed, False
+        self.seq += 1
+        timestamp = datetime.now().isoformat()
+
+        queued = 0
+        for room_id, subscribers in self.subscribers.items():
+            delta = pending.get(room_id)
+            if delta is None and not connections_changed:
+                continue
+
+            stats = self.rooms.get(room_id) or RoomStats()
+            # Encoded once and shared by every subscriber of the room
+            frame = self.encode({
+                "type": "stats_delta",
+                "room_id": None if room_id == ALL_ROOMS else room_id,
+                "seq": self.seq,
+                "changes": delta.changes() if delta else {},
+                "toxicity_rate": stats.toxicity_rate,
+                "active_connections": self.active_connections,
+                "timestamp": timestamp
+            })
+            for subscription in subscribers:
+                subscription.push(frame)
+                queued += 1
+        return queued
+
+    async def run_forever(self):
+        """Push coalesced changes every interval (run as a background task)"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Live stats push failed: {e}")
@@ -2,18 +2,35 @@
 Main FastAPI application with WebSocket support
 """
 import os
+import asyncio
 import logging
-from datetime import datetime
-from typing import List, Dict
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from datetime import date, datetime
+from typing import List, Dict, Optional
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-from database import init_db, get_db
+from database import init_db, get_db, SessionLocal, engine, reserve_message_ids
 from models import ChatMessage, ModerationStats
 from toxicity_detector import ToxicityDetector
+from model_manager import ModelManager
+from profiling import Profiler
 from intent_classifier import IntentClassifier
+from intent_model import LearnedIntentClassifier
 from tone_analyzer import ToneAnalyzer
+from retention import RetentionManager
+from export import MessageExporter, EXPORT_FORMATS, pa
+from search import SearchIndex
+from reputation import ReputationTracker, ALL_ROOMS
+from history import MessageHistory
+from live_stats import LiveStats, KEEPALIVE_FRAME
+from admin import require_admin
+from admission import AdmissionController, DegradationLevel, Overloaded
+from serialization import (
+    EncodedMessage, FastJSONResponse, PROTOCOL_JSON, PROTOCOL_MSGPACK,
+    available_protocols, loads, unpackb
+)
 
 # Configure logging
 logging.basicConfig(
@@ -26,7 +43,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Real-Time Chat Moderation API",
     description="AI-powered chat moderation with toxicity detection, intent classification, and communication coaching",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS configuration
@@ -40,39 +58,102 @@ app.add_middleware(
 
 # Initialize AI models (loaded once at startup)
 logger.info("🚀 Initializing AI models...")
-toxicity_detector = None
 intent_classifier = IntentClassifier()
 tone_analyzer = ToneAnalyzer()
 
+if os.getenv("INTENT_ENGINE", "regex") == "learned":
+    try:
+        intent_classifier = LearnedIntentClassifier.load()
+    except Exception as e:
+        logger.error(f"Failed to load learned intent model: {e}")
+        logger.warning("⚠️ Falling back to regex intent classification")
+
+# On-demand profiling (idle unless an admin starts a capture)
+profiler = Profiler()
+
+# Serves the live toxicity model; candidates can be shadow-scored and hot-swapped.
+# The manager holds the only reference, so a promoted-away model can be freed.
+model_manager = ModelManager(profiler=profiler)
 try:
-    toxicity_detector = ToxicityDetector()
+    model_manager.live = ToxicityDetector()
 except Exception as e:
     logger.error(f"Failed to load toxicity detector: {e}")
     logger.warning("⚠️ Running without toxicity detection")
 
+# Retention: hot window in the database, older messages in the Parquet archive
+retention_manager = RetentionManager()
+exporter = MessageExporter(SessionLocal, retention_manager)
+
+# Full-text search over message history
+search_index = SearchIndex(engine)
+
+# Rolling per-user toxicity reputation (in memory, snapshotted to the DB)
+reputation_tracker = ReputationTracker()
+
+# Per-room ring buffer of recent messages for history reads and reconnect replay
+message_history = MessageHistory()
+
+# In-memory moderation counters pushed to dashboards as coalesced deltas
+live_stats = LiveStats()
+
+# Admission control: shed expensive stages (then whole messages) when latency exceeds the SLO
+admission_controller = AdmissionController()
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
         self.user_connections: Dict[str, WebSocket] = {}
+        self.protocols: Dict[WebSocket, str] = {}
     
     async def connect(self, websocket: WebSocket, username: str):
-        await websocket.accept()
+        # Clients opt into the binary protocol via the "msgpack" WebSocket subprotocol
+        offered = websocket.scope.get("subprotocols", [])
+        protocol = next((p for p in offered if p in available_protocols()), None)
+        await websocket.accept(subprotocol=protocol)
+        
         self.active_connections.append(websocket)
         self.user_connections[username] = websocket
-        logger.info(f"✅ User {username} connected. Total connections: {len(self.active_connections)}")
+        self.protocols[websocket] = protocol or PROTOCOL_JSON
+        live_stats.set_active_connections(len(self.active_connections))
+        logger.info(f"✅ User {username} connected ({self.protocols[websocket]}). Total connections: {len(self.active_connections)}")
     
     def disconnect(self, websocket: WebSocket, username: str):
         self.active_connections.remove(websocket)
+        self.protocols.pop(websocket, None)
         if username in self.user_connections:
             del self.user_connections[username]
+        live_stats.set_active_connections(len(self.active_connections))
         logger.info(f"❌ User {username} disconnected. Total connections: {len(self.active_connections)}")
     
+    async def receive(self, websocket: WebSocket) -> dict:
+        """Receive and decode one client frame (JSON text or msgpack binary)"""
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        
+        if message.get("bytes") is not None:
+            if self.protocols.get(websocket) == PROTOCOL_MSGPACK:
+                return unpackb(message["bytes"])
+            return loads(message["bytes"])
+        return loads(message.get("text") or "{}")
+    
+    async def send(self, websocket: WebSocket, message):
+        """Send a dict or EncodedMessage using the connection's protocol"""
+        if not isinstance(message, EncodedMessage):
+            message = EncodedMessage(message)
+        
+        if self.protocols.get(websocket) == PROTOCOL_MSGPACK:
+            await websocket.send_bytes(message.binary())
+        else:
+            await websocket.send_text(message.text())
+    
     async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
+        """Broadcast message to all connected clients (encoded once per protocol)"""
+        encoded = EncodedMessage(message)
         for connection in self.active_connections:
             try:
-                await connection.send_json(message)
+                await self.send(connection, encoded)
             except Exception as e:
                 logger.error(f"Error broadcasting to client: {e}")
 
@@ -84,9 +165,29 @@ async def startup_event():
     """Initialize database on startup"""
     logger.info("🔧 Initializing database...")
     init_db()
+    # Ids of archived messages must not be handed out again
+    reserve_message_ids(retention_manager.max_archived_id())
+    search_index.setup()
+    
+    db = SessionLocal()
+    try:
+        reputation_tracker.load(db)
+        live_stats.load(db, retention_manager)
+    finally:
+        db.close()
+    
+    asyncio.create_task(retention_manager.run_forever(SessionLocal))
+    asyncio.create_task(reputation_tracker.run_forever(SessionLocal))
+    asyncio.create_task(live_stats.run_forever())
     logger.info("✅ Application startup complete!")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist in-memory state before exiting"""
+    reputation_tracker.snapshot_with_session(SessionLocal)
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -97,7 +198,8 @@ async def root():
         "endpoints": {
             "websocket": "/ws/{username}",
             "messages": "/api/messages",
-            "stats": "/api/stats"
+            "stats": "/api/stats",
+            "stats_stream": "/api/stats/stream"
         }
     }
 
@@ -108,11 +210,12 @@ async def health_check():
     return {
         "status": "healthy",
         "models": {
-            "toxicity_detector": toxicity_detector is not None,
+            "toxicity_detector": model_manager.live is not None,
             "intent_classifier": True,
             "tone_analyzer": tone_analyzer.client is not None
         },
         "connections": len(manager.active_connections),
+        "admission": admission_controller.snapshot(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -126,37 +229,73 @@ async def analyze_message(
     """
     Analyze a message without WebSocket (REST API)
     """
-    result = await process_message(message, username, db)
+    try:
+        async with admission_controller.admit() as level:
+            result = await process_message(message, username, db, level)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     return result
 
 
-async def process_message(message: str, username: str, db: Session) -> dict:
+def _intent_toxicity(intent: str, intent_confidence: float) -> dict:
+    """Cheap toxicity estimate from the regex intent classifier (used instead of BERT under load)"""
+    if intent == "threat":
+        score = max(0.8, intent_confidence)
+        categories = {"threat": score}
+    elif intent == "insult":
+        score = max(0.6, intent_confidence)
+        categories = {"insult": score}
+    else:
+        return {"toxicity_score": 0.0, "is_toxic": False, "categories": {}}
+    return {"toxicity_score": score, "is_toxic": score >= 0.5, "categories": categories}
+
+
+async def process_message(
+    message: str,
+    username: str,
+    db: Session,
+    level: DegradationLevel = DegradationLevel.FULL
+) -> dict:
     """
     Core message processing logic:
-    1. Toxicity detection
-    2. Intent classification
+    1. Intent classification
+    2. Toxicity detection
     3. Tone analysis
     4. Coaching generation
     5. Rewrite suggestion
+    
+    Higher degradation levels replace the LLM and BERT stages with their
+    rule-based fallbacks (see admission.DegradationLevel).
     """
     logger.info(f"Processing message from {username}: {message[:50]}...")
+    use_llm_coaching = level < DegradationLevel.NO_LLM_COACHING
+    use_llm_tone = level < DegradationLevel.NO_LLM_TONE
+    use_bert = level < DegradationLevel.FAST_CLASSIFIER
+    
+    # 1. Intent Classification (cheap, needed by the fast toxicity path)
+    intent, intent_confidence = intent_classifier.classify(message)
     
-    # 1. Toxicity Detection
+    # 2. Toxicity Detection
     toxicity_result = {"toxicity_score": 0.0, "is_toxic": False, "categories": {}}
-    if toxicity_detector:
+    if not use_bert:
+        toxicity_result = _intent_toxicity(intent, intent_confidence)
+    elif model_manager.live:
         try:
-            toxicity_result = toxicity_detector.predict(message)
+            toxicity_result = await model_manager.predict(message)
         except Exception as e:
             logger.error(f"Toxicity detection failed: {e}")
     
-    # 2. Intent Classification
-    intent, intent_confidence = intent_classifier.classify(message)
-    
     # 3. Tone Analysis
-    tone_result = tone_analyzer.analyze_tone(
+    tone_result = await asyncio.to_thread(
+        tone_analyzer.analyze_tone,
         message,
         toxicity_result["toxicity_score"],
-        intent
+        intent,
+        use_llm_tone
     )
     
     # 4. Generate Coaching
@@ -164,17 +303,21 @@ async def process_message(message: str, username: str, db: Session) -> dict:
     suggested_rewrite = None
     
     if toxicity_result["toxicity_score"] > 0.3 or tone_result["tone"] in ["rude", "aggressive"]:
-        coaching_message = tone_analyzer.generate_coaching(
+        coaching_message = await asyncio.to_thread(
+            tone_analyzer.generate_coaching,
             message,
             tone_result["tone"],
             toxicity_result["toxicity_score"],
-            intent
+            intent,
+            use_llm_coaching
         )
         
-        suggested_rewrite = tone_analyzer.suggest_rewrite(
+        suggested_rewrite = await asyncio.to_thread(
+            tone_analyzer.suggest_rewrite,
             message,
             tone_result["tone"],
-            toxicity_result["toxicity_score"]
+            toxicity_result["toxicity_score"],
+            use_llm_coaching
         )
     
     # 5. Save to database
@@ -196,6 +339,17 @@ async def process_message(message: str, username: str, db: Session) -> dict:
     db.add(chat_message)
     db.commit()
     db.refresh(chat_message)
+    # No await between commit and append, so buffers stay in id order
+    message_history.append(chat_message.to_dict())
+    
+    reputation_tracker.record(
+        username,
+        chat_message.room_id,
+        toxicity_result["toxicity_score"],
+        toxicity_result["is_toxic"],
+        toxicity_result.get("categories", {})
+    )
+    live_stats.record(chat_message.room_id, toxicity_result["is_toxic"], intent, tone_result["tone"])
     
     # 6. Prepare response
     response = {
@@ -207,9 +361,9 @@ async def process_message(message: str, username: str, db: Session) -> dict:
                 "score": round(toxicity_result["toxicity_score"], 3),
                 "is_toxic": toxicity_result["is_toxic"],
                 "categories": toxicity_result.get("categories", {}),
-                "top_categories": toxicity_detector.get_top_categories(
+                "top_categories": model_manager.live.get_top_categories(
                     toxicity_result.get("categories", {})
-                ) if toxicity_detector else []
+                ) if model_manager.live else []
             },
             "intent": {
                 "type": intent,
@@ -220,12 +374,17 @@ async def process_message(message: str, username: str, db: Session) -> dict:
                 "type": tone_result["tone"],
                 "confidence": round(tone_result["confidence"], 3),
                 "explanation": tone_result.get("explanation", "")
-            }
+            },
+            "reputation": reputation_tracker.get(username)
         },
         "coaching": {
             "message": coaching_message,
             "suggested_rewrite": suggested_rewrite
         },
+        "degradation": {
+            "level": int(level),
+            "mode": level.mode
+        },
         "timestamp": chat_message.timestamp.isoformat()
     }
     
@@ -235,33 +394,62 @@ async def process_message(message: str, username: str, db: Session) -> dict:
 
 
 @app.websocket("/ws/{username}")
-async def websocket_endpoint(websocket: WebSocket, username: str, db: Session = Depends(get_db)):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    username: str,
+    since: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
     """
     WebSocket endpoint for real-time chat
+    
+    Reconnecting clients pass ?since=<last message id> to replay what they missed.
     """
     await manager.connect(websocket, username)
     
     # Send welcome message
-    await websocket.send_json({
+    await manager.send(websocket, {
         "type": "system",
         "message": f"Welcome {username}! You are now connected to the moderated chat.",
         "timestamp": datetime.now().isoformat()
     })
     
+    # Replay messages missed since the client's last seen message
+    if since is not None:
+        missed, has_more = message_history.since(db, "general", since, message_history.capacity)
+        await manager.send(websocket, {
+            "type": "history",
+            "since": since,
+            "messages": missed,
+            "count": len(missed),
+            "has_more": has_more,
+            "timestamp": datetime.now().isoformat()
+        })
+    
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_json()
+            data = await manager.receive(websocket)
             message_text = data.get("message", "").strip()
             
             if not message_text:
                 continue
             
-            # Process message
-            result = await process_message(message_text, username, db)
+            # Process message (or push back if the server is overloaded)
+            try:
+                async with admission_controller.admit() as level:
+                    result = await process_message(message_text, username, db, level)
+            except Overloaded as e:
+                await manager.send(websocket, {
+                    "type": "backpressure",
+                    "message": str(e),
+                    "retry_after_ms": int(e.retry_after * 1000),
+                    "timestamp": datetime.now().isoformat()
+                })
+                continue
             
             # Send analysis back to sender
-            await websocket.send_json({
+            await manager.send(websocket, {
                 "type": "analysis",
                 **result
             })
@@ -269,6 +457,7 @@ async def websocket_endpoint(websocket: WebSocket, username: str, db: Session =
             # Broadcast message to all users (with moderation info)
             await manager.broadcast({
                 "type": "message",
+                "id": result["id"],
                 "username": username,
                 "message": message_text,
                 "is_toxic": result["analysis"]["toxicity"]["is_toxic"],
@@ -290,48 +479,275 @@ async def websocket_endpoint(websocket: WebSocket, username: str, db: Session =
 
 @app.get("/api/messages")
 async def get_messages(
-    limit: int = 50,
+    limit: int = Query(50, ge=0),
     room_id: str = "general",
+    after_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Get recent chat messages"""
-    messages = db.query(ChatMessage)\
-        .filter(ChatMessage.room_id == room_id)\
-        .order_by(ChatMessage.timestamp.desc())\
-        .limit(limit)\
-        .all()
+    """Get recent chat messages (served from the in-memory history when possible)"""
+    if after_id is not None:
+        messages, has_more = message_history.since(db, room_id, after_id, limit)
+        return {"messages": messages, "count": len(messages), "has_more": has_more}
     
+    messages = message_history.latest(db, room_id, limit)
     return {
-        "messages": [msg.to_dict() for msg in reversed(messages)],
+        "messages": messages,
         "count": len(messages)
     }
 
 
 @app.get("/api/stats")
-async def get_stats(db: Session = Depends(get_db)):
-    """Get moderation statistics"""
-    total = db.query(ChatMessage).count()
-    toxic = db.query(ChatMessage).filter(ChatMessage.is_toxic == 1).count()
+async def get_stats(room_id: Optional[str] = None):
+    """Get moderation statistics (from in-memory counters)"""
+    return live_stats.snapshot(room_id or ALL_ROOMS)
+
+
+@app.get("/api/stats/stream")
+async def stream_stats(room_id: Optional[str] = None):
+    """
+    Server-sent event stream of moderation statistics
     
-    # Intent breakdown
-    intents = db.query(ChatMessage.intent, db.func.count(ChatMessage.id))\
-        .group_by(ChatMessage.intent)\
-        .all()
+    Sends a stats_snapshot event, then stats_delta events with the counter
+    changes, at most once per STATS_PUSH_INTERVAL_MS.
+    """
+    async def events():
+        subscription = live_stats.subscribe(room_id or ALL_ROOMS)
+        try:
+            yield live_stats.snapshot_frame(subscription.room_id)
+            while True:
+                frame = await live_stats.next_frame(subscription)
+                yield frame if frame is not None else KEEPALIVE_FRAME
+        finally:
+            live_stats.unsubscribe(subscription)
     
-    # Tone breakdown
-    tones = db.query(ChatMessage.tone, db.func.count(ChatMessage.id))\
-        .group_by(ChatMessage.tone)\
-        .all()
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/search")
+async def search_messages(
+    q: str,
+    room_id: Optional[str] = None,
+    username: Optional[str] = None,
+    min_toxicity: Optional[float] = None,
+    max_toxicity: Optional[float] = None,
+    intent: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Ranked full-text search over message history
     
-    return {
-        "total_messages": total,
-        "toxic_messages": toxic,
-        "clean_messages": total - toxic,
-        "toxicity_rate": round(toxic / total * 100, 2) if total > 0 else 0,
-        "intents": {intent: count for intent, count in intents if intent},
-        "tones": {tone: count for tone, count in tones if tone},
-        "active_connections": len(manager.active_connections)
-    }
+    Covers only the hot window: messages archived by retention (older than
+    RETENTION_HOT_DAYS) are removed from the index along with their rows.
+    """
+    if not search_index.available:
+        raise HTTPException(status_code=501, detail="Full-text search is not available")
+    
+    try:
+        return search_index.search(
+            db,
+            q,
+            room_id=room_id,
+            username=username,
+            min_toxicity=min_toxicity,
+            max_toxicity=max_toxicity,
+            intent=intent,
+            start=start,
+            end=end,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/api/export", dependencies=[Depends(require_admin)])
+async def export_messages(
+    export_format: str = Query("ndjson", alias="format"),
+    room_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    min_toxicity: Optional[float] = None,
+    max_toxicity: Optional[float] = None,
+    is_toxic: Optional[bool] = None,
+    intent: Optional[str] = None,
+    include_archive: bool = False
+):
+    """Stream message history as NDJSON, CSV or Parquet"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unsupported format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if export_format == "parquet" and pa is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    
+    media_type, extension = EXPORT_FORMATS[export_format]
+    chunks = exporter.stream(
+        export_format,
+        room_id=room_id,
+        start=start,
+        end=end,
+        min_toxicity=min_toxicity,
+        max_toxicity=max_toxicity,
+        is_toxic=is_toxic,
+        intent=intent,
+        include_archive=include_archive
+    )
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="chat_messages.{extension}"'}
+    )
+
+
+@app.get("/api/users/{username}/reputation")
+async def get_user_reputation(username: str, room_id: Optional[str] = None):
+    """Rolling toxicity reputation for a user (overall, or in one room)"""
+    reputation = reputation_tracker.get(username, room_id or ALL_ROOMS)
+    if not reputation:
+        raise HTTPException(status_code=404, detail="No reputation recorded for this user")
+    
+    return reputation
+
+
+@app.get("/api/reputation/leaderboard")
+async def get_reputation_leaderboard(
+    room_id: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    min_messages: int = Query(1, ge=1)
+):
+    """Top offenders by recent toxicity (overall, or in one room)"""
+    offenders = reputation_tracker.leaderboard(room_id or ALL_ROOMS, limit, min_messages)
+    return {"room_id": room_id, "offenders": offenders, "count": len(offenders)}
+
+
+@app.get("/api/admin/models", dependencies=[Depends(require_admin)])
+async def get_model_status():
+    """Live toxicity model and candidate shadow-scoring status"""
+    return model_manager.status()
+
+
+@app.post("/api/admin/models/candidate", status_code=202, dependencies=[Depends(require_admin)])
+async def load_candidate_model(
+    model_name: str,
+    sample_rate: float = Query(0.1, ge=0.0, le=1.0)
+):
+    """Load a candidate toxicity model in the background and shadow-score live traffic"""
+    try:
+        model_manager.load_candidate(model_name, sample_rate)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return model_manager.status()
+
+
+@app.post("/api/admin/models/promote", dependencies=[Depends(require_admin)])
+async def promote_candidate_model():
+    """Atomically swap the candidate in as the live toxicity model"""
+    try:
+        model_manager.promote()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return model_manager.status()
+
+
+@app.delete("/api/admin/models/candidate", dependencies=[Depends(require_admin)])
+async def discard_candidate_model():
+    """Discard the candidate model"""
+    model_manager.discard()
+    return model_manager.status()
+
+
+@app.post("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def capture_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1.0, le=1000.0),
+    torch: bool = False
+):
+    """Capture a time-boxed profile of the live process"""
+    if torch and not profiler.torch_available:
+        raise HTTPException(status_code=501, detail="Torch profiling requires torch")
+    
+    try:
+        profile = await asyncio.to_thread(profiler.capture, seconds, interval_ms, torch)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return profiler.summary(profile)
+
+
+@app.get("/api/admin/profiles/{profile_id}/collapsed", dependencies=[Depends(require_admin)])
+async def download_collapsed_stacks(profile_id: str):
+    """Download collapsed stacks (flamegraph.pl / speedscope input)"""
+    profile = profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return Response(
+        profile["collapsed"],
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
+
+
+@app.get("/api/admin/profiles/{profile_id}/trace", dependencies=[Depends(require_admin)])
+async def download_chrome_trace(profile_id: str):
+    """Download the torch profiler Chrome trace"""
+    profile = profiler.get(profile_id)
+    if not profile or profile["chrome_trace"] is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    
+    return Response(
+        profile["chrome_trace"],
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="trace-{profile_id}.json"'}
+    )
+
+
+@app.get("/api/messages/{message_id}")
+async def get_message(message_id: int, db: Session = Depends(get_db)):
+    """Get a single message by id (falls back to the archive)"""
+    message = db.query(ChatMessage).filter(ChatMessage.id == message_id).first()
+    if message:
+        return message.to_dict()
+    
+    archived = await asyncio.to_thread(retention_manager.get_archived_message, message_id)
+    if not archived:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    return archived
+
+
+@app.get("/api/analytics/toxicity-trend")
+async def get_toxicity_trend(
+    room_id: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    """Daily toxicity trend over archived messages"""
+    trend = await asyncio.to_thread(retention_manager.toxicity_trend, room_id, start, end)
+    return {"trend": trend, "count": len(trend)}
+
+
+@app.get("/api/analytics/intents")
+async def get_intent_mix(
+    room_id: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    """Intent breakdown over archived messages"""
+    intents = await asyncio.to_thread(retention_manager.intent_mix, room_id, start, end)
+    return {"intents": intents, "total_messages": sum(intents.values())}
 
 
 @app.delete("/api/messages/{message_id}")
@@ -340,10 +756,19 @@ async def delete_message(message_id: int, db: Session = Depends(get_db)):
     message = db.query(ChatMessage).filter(ChatMessage.id == message_id).first()
     
     if not message:
+        archived = await asyncio.to_thread(retention_manager.delete_archived_message, message_id)
+        if archived:
+            # A quiet room's buffer can still hold messages retention has archived
+            message_history.remove(message_id, archived["room_id"])
+            live_stats.remove(archived)
+            return {"message": "Message deleted successfully", "id": message_id}
         raise HTTPException(status_code=404, detail="Message not found")
     
+    deleted = message.to_dict()
     db.delete(message)
     db.commit()
+    message_history.remove(message_id, deleted["room_id"])
+    live_stats.remove(deleted)
     
     return {"message": "Message deleted successfully", "id": message_id}
 
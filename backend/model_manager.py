@@ -0,0 +1,220 @@
+"""
+Zero-downtime toxicity model hot-swap with shadow scoring
+
+A candidate model is loaded in the background and scores a sample of live
+traffic off the critical path. Agreement and latency against the live model
+are recorded, and promoting the candidate swaps the serving model with a
+single reference assignment: requests already running keep the detector
+they started with.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from toxicity_detector import ToxicityDetector
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class ShadowStats:
+    """Running comparison between live and candidate predictions"""
+
+    def __init__(self, window: int = 1000):
+        self.samples = 0
+        self.agreements = 0
+        self.score_diff_sum = 0.0
+        self.dropped = 0
+        self.errors = 0
+        self.live_latencies = deque(maxlen=window)
+        self.candidate_latencies = deque(maxlen=window)
+
+    def record(self, live: dict, candidate: dict, live_latency: float, candidate_latency: float):
+        self.samples += 1
+        self.agreements += int(live["is_toxic"] == candidate["is_toxic"])
+        self.score_diff_sum += abs(live["toxicity_score"] - candidate["toxicity_score"])
+        self.live_latencies.append(live_latency)
+        self.candidate_latencies.append(candidate_latency)
+
+    @staticmethod
+    def _latency_summary(latencies) -> dict:
+        if not latencies:
+            return {"mean_ms": None, "p95_ms": None}
+        ordered = sorted(latencies)
+        return {
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "samples": self.samples,
+            "agreement_rate": round(self.agreements / self.samples, 4) if self.samples else None,
+            "mean_score_diff": round(self.score_diff_sum / self.samples, 4) if self.samples else None,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "live_latency": self._latency_summary(self.live_latencies),
+            "candidate_latency": self._latency_summary(self.candidate_latencies),
+        }
+
+
+class ModelManager:
+    """Serve the live toxicity model and manage a shadow-scored candidate"""
+
+    def __init__(self, live: Optional[ToxicityDetector] = None, max_pending: Optional[int] = None, profiler=None):
+        """
+        Initialize model manager
+
+        Args:
+            live: Detector serving traffic (None runs without toxicity detection)
+            max_pending: Shadow jobs allowed to queue before samples are dropped (env: SHADOW_MAX_PENDING)
+            profiler: profiling.Profiler whose torch captures should see live predictions
+        """
+        self.live = live
+        self.profiler = profiler
+        self.max_pending = max_pending or int(os.getenv("SHADOW_MAX_PENDING", 8))
+
+        self.candidate: Optional[ToxicityDetector] = None
+        self.candidate_name: Optional[str] = None
+        self.candidate_status = "none"  # none, loading, shadowing, failed
+        self.candidate_error: Optional[str] = None
+        self.sample_rate = 0.0
+        self.shadow_stats = ShadowStats()
+
+        # A single worker keeps shadow inference from competing with itself
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    async def predict(self, text: str) -> dict:
+        """Score text with the live model and maybe shadow-score it with the candidate"""
+        detector = self.live  # pinned: a swap mid-request does not affect this call
+        started = time.perf_counter()
+        # During a torch profile capture, run on the profiled thread
+        runner = self.profiler.torch_runner if self.profiler else None
+        future = runner.submit(detector.predict, text) if runner else None
+        if future is not None:
+            result = await asyncio.wrap_future(future)
+        else:
+            result = await asyncio.to_thread(detector.predict, text)
+        latency = time.perf_counter() - started
+
+        candidate = self.candidate
+        if candidate is not None and self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._submit_shadow(candidate, text, result, latency)
+        return result
+
+    def _submit_shadow(self, candidate: ToxicityDetector, text: str, live_result: dict, live_latency: float):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.shadow_stats.dropped += 1
+                return
+            self._pending += 1
+        self._shadow_executor.submit(self._shadow_score, candidate, text, live_result, live_latency)
+
+    def _shadow_score(self, candidate: ToxicityDetector, text: str, live_result: dict, live_latency: float):
+        try:
+            started = time.perf_counter()
+            result = candidate.predict(text)
+            latency = time.perf_counter() - started
+            with self._lock:
+                # Ignore results from a candidate that was discarded or promoted meanwhile
+                if candidate is self.candidate:
+                    if "error" in result or "error" in live_result:
+                        self.shadow_stats.errors += 1
+                    else:
+                        self.shadow_stats.record(live_result, result, live_latency, latency)
+        except Exception as e:
+            logger.error(f"Shadow scoring failed: {e}")
+            with self._lock:
+                self.shadow_stats.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    # ------------------------------------------------------------------
+    # Candidate lifecycle
+    # ------------------------------------------------------------------
+
+    def load_candidate(self, model_name: str, sample_rate: float):
+        """Start loading a candidate model in a background thread"""
+        with self._lock:
+            if self.candidate_status == "loading":
+                raise RuntimeError(f"Candidate {self.candidate_name} is still loading")
+            self.candidate = None
+            self.candidate_name = model_name
+            self.candidate_status = "loading"
+            self.candidate_error = None
+            self.sample_rate = sample_rate
+            self.shadow_stats = ShadowStats()
+
+        threading.Thread(target=self._load, args=(model_name,), name="candidate-loader", daemon=True).start()
+
+    def _load(self, model_name: str):
+        try:
+            detector = ToxicityDetector(model_name)
+        except Exception as e:
+            with self._lock:
+                if self.candidate_name == model_name:
+                    self.candidate_status = "failed"
+                    self.candidate_error = str(e)
+            return
+
+        with self._lock:
+            if self.candidate_name == model_name and self.candidate_status == "loading":
+                self.candidate = detector
+                self.candidate_status = "shadowing"
+                logger.info(f"🔁 Candidate model {model_name} loaded, shadow scoring {self.sample_rate:.0%} of traffic")
+
+    def promote(self) -> str:
+        """Make the candidate the live model. Returns the promoted model name."""
+        with self._lock:
+            if self.candidate is None:
+                raise RuntimeError("No loaded candidate model to promote")
+            previous = self.live.model_name if self.live else None
+            self.live = self.candidate  # atomic swap; in-flight requests keep their pinned detector
+            promoted = self.candidate_name
+            self._reset_candidate()
+        logger.info(f"✅ Promoted toxicity model {promoted} (was {previous})")
+        return promoted
+
+    def discard(self):
+        """Drop the candidate model and its shadow statistics"""
+        with self._lock:
+            self._reset_candidate()
+
+    def _reset_candidate(self):
+        self.candidate = None
+        self.candidate_name = None
+        self.candidate_status = "none"
+        self.candidate_error = None
+        self.sample_rate = 0.0
+        self.shadow_stats = ShadowStats()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "live": {
+                    "model_name": self.live.model_name if self.live else None,
+                    "device": self.live.device if self.live else None,
+                },
+                "candidate": {
+                    "model_name": self.candidate_name,
+                    "status": self.candidate_status,
+                    "error": self.candidate_error,
+                    "sample_rate": self.sample_rate,
+                    "shadow": self.shadow_stats.to_dict(),
+                },
+            }
@@ -1,6 +1,9 @@
 """
 Database models for chat moderation system
 """
+from datetime import datetime, timezone
+from typing import Optional
+
 from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -8,9 +11,18 @@ from sqlalchemy.sql import func
 Base = declarative_base()
 
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; normalize aware datetimes to match"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 class ChatMessage(Base):
     """Store chat messages with moderation results"""
     __tablename__ = "chat_messages"
+    # Never reuse ids: archived messages stay retrievable by id after their rows are deleted
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(100), nullable=False, index=True)
@@ -34,7 +46,7 @@ class ChatMessage(Base):
     suggested_rewrite = Column(Text, nullable=True)
     
     # Metadata
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     room_id = Column(String(100), default="general", index=True)
     
     def to_dict(self):
@@ -79,3 +91,22 @@ class ModerationStats(Base):
     aggressive = Column(Integer, default=0)
     
     date = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserReputation(Base):
+    """Snapshot of a user's rolling toxicity reputation (per room, "*" = all rooms)"""
+    __tablename__ = "user_reputation"
+    
+    username = Column(String(100), primary_key=True)
+    room_id = Column(String(100), primary_key=True)
+    
+    # Exponentially decayed sums (as of updated_at)
+    toxicity_sum = Column(Float, default=0.0)
+    message_weight = Column(Float, default=0.0)
+    categories = Column(JSON, default=dict)  # {"insult": 2.4, "threat": 0.7}
+    
+    # Lifetime counters
+    total_messages = Column(Integer, default=0)
+    toxic_messages = Column(Integer, default=0)
+    
+    updated_at = Column(Float, default=0.0)  # Unix time of last update
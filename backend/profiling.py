@@ -0,0 +1,245 @@
+"""
+On-demand profiling of the live process
+
+A capture runs for a fixed time and produces:
+- collapsed stacks from a sampling profiler over all Python threads
+  (feed to flamegraph.pl, speedscope or inferno)
+- optionally, a Chrome trace of ToxicityDetector operators from the torch
+  profiler (open in chrome://tracing or Perfetto)
+
+Nothing runs while no capture is active: the sampler thread only exists
+during a capture, and the model path pays a single attribute check.
+"""
+import os
+import sys
+import time
+import uuid
+import queue
+import logging
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import torch.profiler as torch_profiler
+except ImportError:  # pragma: no cover - optional dependency
+    torch_profiler = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class StackSampler(threading.Thread):
+    """Sample the Python stacks of all other threads at a fixed interval"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                self.stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(name.replace(";", ":") for name in reversed(frames))
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks"""
+        self._stop_event.set()
+        self.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class TorchProfileRunner(threading.Thread):
+    """
+    Run model calls on one thread under the torch profiler
+
+    The torch profiler records operators on the thread it is enabled on, so
+    while a capture is active ToxicityDetector calls are routed here.
+    """
+
+    def __init__(self, duration: float):
+        super().__init__(name="torch-profiler", daemon=True)
+        self.duration = duration
+        self.trace: Optional[bytes] = None
+        self.error: Optional[str] = None
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._accepting = True
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args) -> Optional[Future]:
+        """Queue fn(*args) on the profiled thread (None once the capture is over)"""
+        with self._lock:
+            if not self._accepting:
+                return None
+            future: Future = Future()
+            self._jobs.put((future, fn, args))
+        return future
+
+    def _close(self):
+        """Stop accepting jobs and run the ones already queued"""
+        with self._lock:
+            self._accepting = False
+        self._drain()
+
+    def run(self):
+        activities = [torch_profiler.ProfilerActivity.CPU]
+        try:
+            import torch
+            if torch.cuda.is_available():
+                activities.append(torch_profiler.ProfilerActivity.CUDA)
+        except ImportError:  # pragma: no cover
+            pass
+
+        deadline = time.monotonic() + self.duration
+        try:
+            with torch_profiler.profile(activities=activities, record_shapes=True) as prof:
+                while time.monotonic() < deadline:
+                    try:
+                        future, fn, args = self._jobs.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    self._run_job(future, fn, args)
+                self._close()
+
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                path = tmp.name
+            try:
+                prof.export_chrome_trace(path)
+                with open(path, "rb") as f:
+                    self.trace = f.read()
+            finally:
+                os.remove(path)
+        except Exception as e:
+            logger.error(f"Torch profiling failed: {e}")
+            self.error = str(e)
+            self._close()
+
+    def _drain(self):
+        while True:
+            try:
+                future, fn, args = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            self._run_job(future, fn, args)
+
+    @staticmethod
+    def _run_job(future: Future, fn: Callable, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+
+class Profiler:
+    """Time-boxed profile captures with downloadable artifacts"""
+
+    def __init__(self, max_seconds: Optional[float] = None, keep: int = 5):
+        """
+        Initialize profiler
+
+        Args:
+            max_seconds: Longest allowed capture (env: PROFILE_MAX_SECONDS)
+            keep: Number of finished captures kept for download
+        """
+        self.max_seconds = max_seconds or float(os.getenv("PROFILE_MAX_SECONDS", 60))
+        self.keep = keep
+        self.torch_runner: Optional[TorchProfileRunner] = None
+        self.profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._active = False
+
+    @property
+    def torch_available(self) -> bool:
+        return torch_profiler is not None
+
+    def capture(self, seconds: float, interval_ms: float = 5.0, include_torch: bool = False) -> dict:
+        """
+        Profile the process for `seconds` (blocking; run in a worker thread)
+
+        Raises:
+            RuntimeError: if a capture is already running
+        """
+        with self._lock:
+            if self._active:
+                raise RuntimeError("A profile capture is already running")
+            self._active = True
+
+        try:
+            seconds = min(seconds, self.max_seconds)
+            started = time.time()
+            sampler = StackSampler(interval_ms / 1000)
+            sampler.start()
+
+            runner = None
+            if include_torch:
+                runner = TorchProfileRunner(seconds)
+                runner.start()
+                self.torch_runner = runner
+
+            time.sleep(seconds)
+            collapsed = sampler.stop()
+            if runner is not None:
+                runner.join()
+                self.torch_runner = None
+
+            profile_id = uuid.uuid4().hex[:12]
+            profile = {
+                "id": profile_id,
+                "started_at": started,
+                "duration": round(time.time() - started, 3),
+                "samples": sampler.samples,
+                "collapsed": collapsed,
+                "chrome_trace": runner.trace if runner else None,
+                "torch_error": runner.error if runner else None,
+            }
+            with self._lock:
+                self.profiles[profile_id] = profile
+                while len(self.profiles) > self.keep:
+                    self.profiles.popitem(last=False)
+            logger.info(f"📈 Profile {profile_id} captured: {sampler.samples} samples over {profile['duration']}s")
+            return profile
+        finally:
+            self.torch_runner = None
+            with self._lock:
+                self._active = False
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        return self.profiles.get(profile_id)
+
+    @staticmethod
+    def summary(profile: dict) -> dict:
+        """Profile metadata with artifact URLs (without the artifacts themselves)"""
+        base = f"/api/admin/profiles/{profile['id']}"
+        artifacts = {"collapsed_stacks": f"{base}/collapsed"}
+        if profile["chrome_trace"] is not None:
+            artifacts["chrome_trace"] = f"{base}/trace"
+        return {
+            "id": profile["id"],
+            "duration": profile["duration"],
+            "samples": profile["samples"],
+            "torch_error": profile["torch_error"],
+            "artifacts": artifacts,
+        }
@@ -0,0 +1,231 @@
+"""
+Rolling per-user toxicity reputation
+
+Keeps exponentially decayed toxicity, message counts and category
+histograms per user (overall and per room) in memory, updated
+incrementally as messages are processed. Lookups are O(1) and the
+leaderboard never touches the message table; state is periodically
+snapshotted to the user_reputation table and reloaded on startup.
+"""
+import os
+import time
+import heapq
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from models import UserReputation
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+ALL_ROOMS = "*"
+
+
+class Reputation:
+    """Decayed toxicity statistics for one user in one room"""
+
+    __slots__ = ("toxicity_sum", "message_weight", "categories", "total_messages", "toxic_messages", "updated_at")
+
+    def __init__(self, updated_at: float):
+        self.toxicity_sum = 0.0
+        self.message_weight = 0.0
+        self.categories: Dict[str, float] = {}
+        self.total_messages = 0
+        self.toxic_messages = 0
+        self.updated_at = updated_at
+
+    def decay_to(self, now: float, half_life: float):
+        """Apply exponential decay for the time elapsed since the last update"""
+        elapsed = now - self.updated_at
+        if elapsed <= 0:
+            return
+        factor = 0.5 ** (elapsed / half_life)
+        self.toxicity_sum *= factor
+        self.message_weight *= factor
+        for category in self.categories:
+            self.categories[category] *= factor
+        self.updated_at = now
+
+    def heat(self, now: float, half_life: float) -> float:
+        """Decayed toxicity sum as of now (recent toxic volume)"""
+        return self.toxicity_sum * 0.5 ** (max(now - self.updated_at, 0.0) / half_life)
+
+    @property
+    def average_toxicity(self) -> float:
+        """Decay-weighted mean toxicity (decay cancels out of the ratio)"""
+        return self.toxicity_sum / self.message_weight if self.message_weight else 0.0
+
+
+class ReputationTracker:
+    """In-memory per-user reputation with periodic DB snapshots"""
+
+    def __init__(
+        self,
+        half_life_hours: Optional[float] = None,
+        offender_threshold: Optional[float] = None,
+        min_messages: Optional[int] = None,
+        snapshot_seconds: Optional[int] = None,
+    ):
+        """
+        Initialize reputation tracker
+
+        Args:
+            half_life_hours: Time for past toxicity to lose half its weight (env: REPUTATION_HALF_LIFE_HOURS)
+            offender_threshold: Average toxicity that marks a repeat offender (env: REPUTATION_OFFENDER_THRESHOLD)
+            min_messages: Messages needed before a user can be flagged (env: REPUTATION_MIN_MESSAGES)
+            snapshot_seconds: Delay between DB snapshots (env: REPUTATION_SNAPSHOT_SECONDS)
+        """
+        self.half_life = (half_life_hours or float(os.getenv("REPUTATION_HALF_LIFE_HOURS", 72))) * 3600
+        self.offender_threshold = offender_threshold or float(os.getenv("REPUTATION_OFFENDER_THRESHOLD", 0.5))
+        self.min_messages = min_messages or int(os.getenv("REPUTATION_MIN_MESSAGES", 5))
+        self.snapshot_seconds = snapshot_seconds or int(os.getenv("REPUTATION_SNAPSHOT_SECONDS", 60))
+
+        # room_id -> username -> Reputation (ALL_ROOMS holds each user's overall reputation)
+        self.rooms: Dict[str, Dict[str, Reputation]] = {ALL_ROOMS: {}}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Updates and lookups
+    # ------------------------------------------------------------------
+
+    def record(
+        self,
+        username: str,
+        room_id: str,
+        toxicity_score: float,
+        is_toxic: bool,
+        categories: Optional[Dict[str, float]] = None,
+        now: Optional[float] = None,
+    ):
+        """Fold one processed message into the user's overall and per-room reputation"""
+        now = now if now is not None else time.time()
+        flagged = [name for name, score in (categories or {}).items() if score >= 0.5]
+
+        with self._lock:
+            for room in (ALL_ROOMS, room_id):
+                users = self.rooms.setdefault(room, {})
+                reputation = users.get(username)
+                if reputation is None:
+                    reputation = users[username] = Reputation(now)
+                reputation.decay_to(now, self.half_life)
+
+                reputation.toxicity_sum += toxicity_score
+                reputation.message_weight += 1.0
+                for category in flagged:
+                    reputation.categories[category] = reputation.categories.get(category, 0.0) + 1.0
+                reputation.total_messages += 1
+                reputation.toxic_messages += int(is_toxic)
+                self._dirty.add((room, username))
+
+    def get(self, username: str, room_id: str = ALL_ROOMS, now: Optional[float] = None) -> Optional[dict]:
+        """Reputation summary for a user (None if the user has no messages)"""
+        reputation = self.rooms.get(room_id, {}).get(username)
+        if reputation is None:
+            return None
+        return self._to_dict(username, room_id, reputation, now if now is not None else time.time())
+
+    def _is_offender(self, reputation: Reputation) -> bool:
+        return (
+            reputation.total_messages >= self.min_messages
+            and reputation.average_toxicity >= self.offender_threshold
+        )
+
+    def leaderboard(self, room_id: str = ALL_ROOMS, limit: int = 10, min_messages: int = 1) -> List[dict]:
+        """Top offenders in a room, ranked by recent (decayed) toxicity"""
+        now = time.time()
+        with self._lock:
+            candidates = [
+                (username, reputation)
+                for username, reputation in self.rooms.get(room_id, {}).items()
+                if reputation.total_messages >= min_messages
+            ]
+            top = heapq.nlargest(limit, candidates, key=lambda item: item[1].heat(now, self.half_life))
+            return [self._to_dict(username, room_id, reputation, now) for username, reputation in top]
+
+    def _to_dict(self, username: str, room_id: str, reputation: Reputation, now: float) -> dict:
+        factor = 0.5 ** (max(now - reputation.updated_at, 0.0) / self.half_life)
+        return {
+            "username": username,
+            "room_id": None if room_id == ALL_ROOMS else room_id,
+            "average_toxicity": round(reputation.average_toxicity, 3),
+            "recent_toxicity": round(reputation.toxicity_sum * factor, 3),
+            "total_messages": reputation.total_messages,
+            "toxic_messages": reputation.toxic_messages,
+            "categories": {
+                category: round(count * factor, 2)
+                for category, count in sorted(reputation.categories.items(), key=lambda item: item[1], reverse=True)
+            },
+            "repeat_offender": self._is_offender(reputation),
+        }
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def load(self, db: Session):
+        """Restore in-memory state from the last snapshot"""
+        count = 0
+        with self._lock:
+            for row in db.query(UserReputation).yield_per(1000):
+                reputation = Reputation(row.updated_at or 0.0)
+                reputation.toxicity_sum = row.toxicity_sum or 0.0
+                reputation.message_weight = row.message_weight or 0.0
+                reputation.categories = dict(row.categories or {})
+                reputation.total_messages = row.total_messages or 0
+                reputation.toxic_messages = row.toxic_messages or 0
+                self.rooms.setdefault(row.room_id, {})[row.username] = reputation
+                count += 1
+        if count:
+            logger.info(f"✅ Loaded {count} user reputation records")
+
+    def snapshot(self, db: Session) -> int:
+        """Write reputations changed since the last snapshot. Returns rows written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = []
+            for room_id, username in dirty:
+                reputation = self.rooms[room_id][username]
+                rows.append(UserReputation(
+                    username=username,
+                    room_id=room_id,
+                    toxicity_sum=reputation.toxicity_sum,
+                    message_weight=reputation.message_weight,
+                    categories=dict(reputation.categories),
+                    total_messages=reputation.total_messages,
+                    toxic_messages=reputation.toxic_messages,
+                    updated_at=reputation.updated_at,
+                ))
+
+        try:
+            for row in rows:
+                db.merge(row)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        return len(rows)
+
+    async def run_forever(self, session_factory):
+        """Periodically snapshot changed reputations (run as a background task)"""
+        while True:
+            await asyncio.sleep(self.snapshot_seconds)
+            try:
+                await asyncio.to_thread(self.snapshot_with_session, session_factory)
+            except Exception as e:
+                logger.error(f"Reputation snapshot failed: {e}")
+
+    def snapshot_with_session(self, session_factory) -> int:
+        db = session_factory()
+        try:
+            return self.snapshot(db)
+        finally:
+            db.close()
@@ -0,0 +1,383 @@
+"""
+Message retention and columnar cold archive
+
+Keeps a hot window of recent messages in the database and moves older rows
+into compressed Parquet files partitioned by day and room:
+
+    ARCHIVE_DIR/day=2024-01-28/room=general/part-<first_id>-<last_id>.parquet
+"""
+import os
+import json
+import glob
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from models import ChatMessage
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow.fs import LocalFileSystem
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+def message_schema():
+    """Arrow schema used for archived and exported messages"""
+    return pa.schema([
+        ("id", pa.int64()),
+        ("username", pa.string()),
+        ("message", pa.string()),
+        ("toxicity_score", pa.float64()),
+        ("is_toxic", pa.int8()),
+        ("toxic_categories", pa.string()),  # JSON encoded
+        ("intent", pa.string()),
+        ("intent_confidence", pa.float64()),
+        ("tone", pa.string()),
+        ("tone_confidence", pa.float64()),
+        ("coaching_message", pa.string()),
+        ("suggested_rewrite", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("room_id", pa.string()),
+    ])
+
+
+def message_to_record(row) -> dict:
+    """Flatten a ChatMessage (ORM object or Core row) into an archive record"""
+    return {
+        "id": row.id,
+        "username": row.username,
+        "message": row.message,
+        "toxicity_score": row.toxicity_score or 0.0,
+        "is_toxic": row.is_toxic or 0,
+        "toxic_categories": json.dumps(row.toxic_categories or {}),
+        "intent": row.intent,
+        "intent_confidence": row.intent_confidence or 0.0,
+        "tone": row.tone,
+        "tone_confidence": row.tone_confidence or 0.0,
+        "coaching_message": row.coaching_message,
+        "suggested_rewrite": row.suggested_rewrite,
+        "timestamp": row.timestamp.replace(tzinfo=None) if row.timestamp else None,
+        "room_id": row.room_id or "general",
+    }
+
+
+class RetentionManager:
+    """Move messages older than the hot window into a Parquet archive"""
+
+    def __init__(
+        self,
+        archive_dir: Optional[str] = None,
+        hot_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        interval_seconds: Optional[int] = None,
+    ):
+        """
+        Initialize retention manager
+
+        Args:
+            archive_dir: Root directory of the Parquet archive (env: ARCHIVE_DIR)
+            hot_days: Days of messages kept in the database (env: RETENTION_HOT_DAYS)
+            batch_size: Rows moved per archive batch (env: RETENTION_BATCH_SIZE)
+            interval_seconds: Delay between background runs (env: RETENTION_INTERVAL_SECONDS)
+        """
+        self.archive_dir = os.path.abspath(archive_dir or os.getenv("ARCHIVE_DIR", "./archive"))
+        self.hot_days = hot_days if hot_days is not None else int(os.getenv("RETENTION_HOT_DAYS", 30))
+        self.batch_size = batch_size or int(os.getenv("RETENTION_BATCH_SIZE", 5000))
+        self.interval_seconds = interval_seconds or int(os.getenv("RETENTION_INTERVAL_SECONDS", 3600))
+        self.enabled = pa is not None and self.hot_days > 0
+        self._file_index: Optional[List[Tuple[int, int, str]]] = None
+
+        if pa is None:
+            logger.warning("⚠️ pyarrow not installed. Message archiving is disabled.")
+        elif self.hot_days <= 0:
+            logger.info("Message archiving disabled (RETENTION_HOT_DAYS <= 0)")
+
+    # ------------------------------------------------------------------
+    # Archiving
+    # ------------------------------------------------------------------
+
+    def archive_once(self, db: Session) -> int:
+        """
+        Move every message older than the hot window into the archive
+
+        Returns:
+            Number of messages archived
+        """
+        if not self.enabled:
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(days=self.hot_days)
+        archived = 0
+
+        while True:
+            rows = db.query(ChatMessage)\
+                .filter(ChatMessage.timestamp < cutoff)\
+                .order_by(ChatMessage.id)\
+                .limit(self.batch_size)\
+                .all()
+            if not rows:
+                break
+
+            partitions: Dict[Tuple[str, str], List[ChatMessage]] = defaultdict(list)
+            for row in rows:
+                partitions[(row.timestamp.date().isoformat(), row.room_id or "general")].append(row)
+
+            # Files are written before the rows are deleted, so a crash in between
+            # only leaves rows that get re-archived (and overwritten) on the next run
+            for (day, room_id), partition_rows in partitions.items():
+                self._write_partition(day, room_id, partition_rows)
+
+            ids = [row.id for row in rows]
+            db.query(ChatMessage)\
+                .filter(ChatMessage.id.in_(ids))\
+                .delete(synchronize_session=False)
+            db.commit()
+            archived += len(rows)
+
+        if archived:
+            self._file_index = None
+            logger.info(f"📦 Archived {archived} messages older than {cutoff.date().isoformat()}")
+        return archived
+
+    def _write_partition(self, day: str, room_id: str, rows: List[ChatMessage]):
+        """Write one day/room partition as a zstd-compressed Parquet file"""
+        table = pa.Table.from_pylist([message_to_record(row) for row in rows], schema=message_schema())
+        directory = os.path.join(self.archive_dir, f"day={day}", f"room={quote(room_id, safe='')}")
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, f"part-{rows[0].id}-{rows[-1].id}.parquet")
+        self._write_table(table, path)
+
+    @staticmethod
+    def _write_table(table, path: str):
+        """Atomically write a table (write to a temp file, then rename)"""
+        tmp_path = path + ".tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _record_to_dict(record: dict) -> dict:
+        """Convert an archived record to the same shape as ChatMessage.to_dict()"""
+        timestamp = record["timestamp"]
+        return {
+            "id": record["id"],
+            "username": record["username"],
+            "message": record["message"],
+            "toxicity_score": round(record["toxicity_score"], 3),
+            "is_toxic": bool(record["is_toxic"]),
+            "toxic_categories": json.loads(record["toxic_categories"] or "{}"),
+            "intent": record["intent"],
+            "intent_confidence": round(record["intent_confidence"], 3) if record["intent_confidence"] else 0,
+            "tone": record["tone"],
+            "tone_confidence": round(record["tone_confidence"], 3) if record["tone_confidence"] else 0,
+            "coaching_message": record["coaching_message"],
+            "suggested_rewrite": record["suggested_rewrite"],
+            "timestamp": timestamp.isoformat() if timestamp else None,
+            "room_id": record["room_id"],
+        }
+
+    # ------------------------------------------------------------------
+    # Lookup by id
+    # ------------------------------------------------------------------
+
+    def _index(self) -> List[Tuple[int, int, str]]:
+        """(first_id, last_id, path) of every archive file, from the file names"""
+        if self._file_index is None:
+            index = []
+            for path in glob.glob(os.path.join(self.archive_dir, "day=*", "room=*", "part-*.parquet")):
+                try:
+                    first_id, last_id = os.path.basename(path)[len("part-"):-len(".parquet")].split("-")
+                    index.append((int(first_id), int(last_id), path))
+                except ValueError:
+                    logger.warning(f"Skipping unrecognized archive file: {path}")
+            self._file_index = index
+        return self._file_index
+
+    def _files_for_id(self, message_id: int) -> List[str]:
+        """Archive files whose id range (encoded in the file name) covers message_id"""
+        return [path for first_id, last_id, path in self._index() if first_id <= message_id <= last_id]
+
+    def max_archived_id(self) -> int:
+        """Highest message id in the archive (0 if there is none)"""
+        if not self.enabled:
+            return 0
+        return max((last_id for _, last_id, _ in self._index()), default=0)
+
+    def get_archived_message(self, message_id: int) -> Optional[dict]:
+        """Fetch a single archived message by id, or None if it is not archived"""
+        if not self.enabled:
+            return None
+
+        for path in self._files_for_id(message_id):
+            table = pq.read_table(path, filters=[("id", "==", message_id)], memory_map=True)
+            if table.num_rows:
+                return self._record_to_dict(table.to_pylist()[0])
+        return None
+
+    def delete_archived_message(self, message_id: int) -> Optional[dict]:
+        """Remove a message from the archive (moderation action). Returns the removed message, or None."""
+        if not self.enabled:
+            return None
+
+        for path in self._files_for_id(message_id):
+            table = pq.read_table(path)
+            keep = pc.not_equal(table["id"], message_id)
+            remaining = table.filter(keep)
+            if remaining.num_rows == table.num_rows:
+                continue
+            removed = table.filter(pc.invert(keep)).to_pylist()[0]
+            if remaining.num_rows:
+                self._write_table(remaining, path)
+            else:
+                os.remove(path)
+                self._file_index = None
+            return self._record_to_dict(removed)
+        return None
+
+    # ------------------------------------------------------------------
+    # Analytics
+    # ------------------------------------------------------------------
+
+    def _scan(
+        self,
+        columns: List[str],
+        room_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        """Memory-mapped columnar scan of the archive with partition pruning"""
+        dataset = self.dataset()
+        if dataset is None:
+            return None
+
+        return dataset.to_table(columns=columns, filter=self.partition_filter(room_id, start, end))
+
+    def dataset(self):
+        """Open the archive as a memory-mapped Arrow dataset (None if there is no archive)"""
+        if not self.enabled or not os.path.isdir(self.archive_dir):
+            return None
+
+        return ds.dataset(
+            self.archive_dir,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([("day", pa.string()), ("room", pa.string())]),
+                flavor="hive"
+            ),
+            filesystem=LocalFileSystem(use_mmap=True),
+            exclude_invalid_files=True,
+        )
+
+    @staticmethod
+    def partition_filter(
+        room_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        """Build a dataset filter on the day/room partition keys"""
+        expression = None
+        conditions = []
+        if room_id is not None:
+            conditions.append(ds.field("room") == room_id)
+        if start is not None:
+            conditions.append(ds.field("day") >= start.isoformat())
+        if end is not None:
+            conditions.append(ds.field("day") <= end.isoformat())
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def toxicity_trend(
+        self,
+        room_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[dict]:
+        """Daily message count, toxic count and mean toxicity over the archive"""
+        table = self._scan(["day", "toxicity_score", "is_toxic"], room_id, start, end)
+        if table is None or table.num_rows == 0:
+            return []
+
+        grouped = table.group_by("day").aggregate([
+            ("toxicity_score", "count"),
+            ("is_toxic", "sum"),
+            ("toxicity_score", "mean"),
+        ]).sort_by("day")
+
+        return [
+            {
+                "date": row["day"],
+                "total_messages": row["toxicity_score_count"],
+                "toxic_messages": row["is_toxic_sum"],
+                "toxicity_rate": round(row["is_toxic_sum"] / row["toxicity_score_count"] * 100, 2)
+                if row["toxicity_score_count"] else 0,
+                "avg_toxicity": round(row["toxicity_score_mean"], 3),
+            }
+            for row in grouped.to_pylist()
+        ]
+
+    def intent_mix(
+        self,
+        room_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, int]:
+        """Message count per intent over the archive"""
+        table = self._scan(["intent"], room_id, start, end)
+        if table is None or table.num_rows == 0:
+            return {}
+
+        counts = pc.value_counts(table["intent"]).to_pylist()
+        return {item["values"]: item["counts"] for item in counts if item["values"]}
+
+    def message_counts(self) -> List[Tuple[str, str, str, int, int]]:
+        """Archived message counts as (room_id, intent, tone, is_toxic, count) groups"""
+        table = self._scan(["room_id", "intent", "tone", "is_toxic"])
+        if table is None or table.num_rows == 0:
+            return []
+
+        grouped = table.group_by(["room_id", "intent", "tone", "is_toxic"]).aggregate([([], "count_all")])
+        return [
+            (row["room_id"], row["intent"], row["tone"], row["is_toxic"], row["count_all"])
+            for row in grouped.to_pylist()
+        ]
+
+    # ------------------------------------------------------------------
+    # Background task
+    # ------------------------------------------------------------------
+
+    async def run_forever(self, session_factory):
+        """Periodically archive old messages (run as a background task)"""
+        if not self.enabled:
+            return
+
+        logger.info(
+            f"🗄️ Retention enabled: keeping {self.hot_days} days hot, "
+            f"archiving to {self.archive_dir} every {self.interval_seconds}s"
+        )
+        while True:
+            try:
+                await asyncio.to_thread(self._archive_with_session, session_factory)
+            except Exception as e:
+                logger.error(f"Message archiving failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def _archive_with_session(self, session_factory) -> int:
+        db = session_factory()
+        try:
+            return self.archive_once(db)
+        finally:
+            db.close()
@@ -0,0 +1,209 @@
+"""
+Full-text search over moderated message history
+
+SQLite uses an external-content FTS5 table kept in sync by triggers;
+PostgreSQL uses a GIN index on to_tsvector('english', message), which the
+database maintains itself. Results are ranked and paged by position within
+a snapshot: the first page pins the highest message id, later pages skip the
+results already returned. A rank-valued cursor would not work because bm25
+scores use corpus statistics and shift whenever messages are inserted.
+
+Only rows in chat_messages are indexed. When retention archives a message
+its row is deleted, and the delete trigger (or Postgres) drops it from the
+index, so search covers the last RETENTION_HOT_DAYS days only.
+"""
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models import ChatMessage, naive_utc
+
+logger = logging.getLogger(__name__)
+
+
+FTS_TABLE = "chat_messages_fts"
+
+SQLITE_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        message, content='chat_messages', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, message) VALUES (new.id, new.message);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF message ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO {FTS_TABLE}(rowid, message) VALUES (new.id, new.message);
+    END""",
+]
+
+POSTGRES_SETUP = [
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_message_fts "
+    "ON chat_messages USING GIN (to_tsvector('english', message))",
+]
+
+
+def encode_cursor(max_id: int, offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([max_id, offset]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a pagination cursor into (snapshot max id, offset) (raises ValueError if malformed)"""
+    try:
+        max_id, offset = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        max_id, offset = int(max_id), int(offset)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return max_id, offset
+
+
+def to_fts5_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query
+
+    Every word becomes a quoted term (all must match); a trailing * keeps
+    prefix matching, e.g. 'idi*' matches 'idiot'.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', "")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """Indexed full-text search over ChatMessage.message"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.available = False
+
+    def setup(self):
+        """Create the full-text index (and backfill it on first run)"""
+        try:
+            with self.engine.begin() as conn:
+                if self.dialect == "sqlite":
+                    exists = conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {"name": FTS_TABLE}
+                    ).first()
+                    for statement in SQLITE_SETUP:
+                        conn.execute(text(statement))
+                    if not exists:
+                        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                        logger.info("🔎 Built full-text index for existing messages")
+                elif self.dialect == "postgresql":
+                    for statement in POSTGRES_SETUP:
+                        conn.execute(text(statement))
+                else:
+                    logger.warning(f"⚠️ Full-text search is not supported on {self.dialect}")
+                    return
+            self.available = True
+        except Exception as e:
+            logger.error(f"Failed to set up full-text search: {e}")
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        room_id: Optional[str] = None,
+        username: Optional[str] = None,
+        min_toxicity: Optional[float] = None,
+        max_toxicity: Optional[float] = None,
+        intent: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """
+        Ranked full-text search with filters and snapshot pagination
+
+        Messages posted after the first page are left out of later pages.
+
+        Returns:
+            Dictionary with matching messages (best first), count and next_cursor
+        """
+        if cursor:
+            max_id, offset = decode_cursor(cursor)
+        else:
+            max_id, offset = db.query(func.max(ChatMessage.id)).scalar() or 0, 0
+        start, end = naive_utc(start), naive_utc(end)
+
+        if self.dialect == "sqlite":
+            match_query = to_fts5_query(query)
+            if not match_query:
+                return {"results": [], "count": 0, "next_cursor": None}
+
+            fts = table(FTS_TABLE, column("rowid"))
+            # bm25() is lower-is-better, so results are ordered by rank ascending
+            ranked = select(
+                ChatMessage.id.label("id"),
+                literal_column(f"bm25({FTS_TABLE})").label("rank")
+            ).select_from(
+                ChatMessage.__table__.join(fts, fts.c.rowid == ChatMessage.id)
+            ).where(
+                text(f"{FTS_TABLE} MATCH :match_query").bindparams(match_query=match_query)
+            )
+        else:
+            # Must match the indexed expression for the GIN index to be used
+            vector = func.to_tsvector(literal_column("'english'"), ChatMessage.message)
+            tsquery = func.websearch_to_tsquery(literal_column("'english'"), query)
+            ranked = select(
+                ChatMessage.id.label("id"),
+                (-func.ts_rank_cd(vector, tsquery)).label("rank")
+            ).where(vector.op("@@")(tsquery))
+
+        ranked = ranked.where(ChatMessage.id <= max_id)
+        if room_id is not None:
+            ranked = ranked.where(ChatMessage.room_id == room_id)
+        if username is not None:
+            ranked = ranked.where(ChatMessage.username == username)
+        if min_toxicity is not None:
+            ranked = ranked.where(ChatMessage.toxicity_score >= min_toxicity)
+        if max_toxicity is not None:
+            ranked = ranked.where(ChatMessage.toxicity_score <= max_toxicity)
+        if intent is not None:
+            ranked = ranked.where(ChatMessage.intent == intent)
+        if start is not None:
+            ranked = ranked.where(ChatMessage.timestamp >= start)
+        if end is not None:
+            ranked = ranked.where(ChatMessage.timestamp < end)
+
+        ranked = ranked.subquery()
+        page = select(ranked.c.id, ranked.c.rank).order_by(
+            ranked.c.rank, ranked.c.id
+        ).offset(offset).limit(limit + 1)
+
+        hits: List[Tuple[int, float]] = [(row.id, row.rank) for row in db.execute(page)]
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = encode_cursor(max_id, offset + limit)
+
+        messages = {
+            message.id: message
+            for message in db.query(ChatMessage).filter(ChatMessage.id.in_([id_ for id_, _ in hits])).all()
+        } if hits else {}
+
+        results = []
+        for message_id, rank in hits:
+            if message_id in messages:
+                result = messages[message_id].to_dict()
+                result["score"] = round(-rank, 4)
+                results.append(result)
+
+        return {"results": results, "count": len(results), "next_cursor": next_cursor}
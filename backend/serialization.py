@@ -0,0 +1,101 @@
+"""
+Fast serialization for REST and WebSocket payloads
+
+Uses orjson when available (falls back to the standard json module) and
+msgpack for the optional binary WebSocket protocol.
+"""
+import json
+import logging
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+PROTOCOL_JSON = "json"
+PROTOCOL_MSGPACK = "msgpack"
+
+
+def _default(obj: Any):
+    """Fallback for types neither encoder handles natively"""
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "item"):  # numpy scalars
+        return obj.item()
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data) -> Any:
+    """Decode JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(obj: Any) -> bytes:
+    """Encode obj with msgpack"""
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    """Decode msgpack bytes"""
+    return msgpack.unpackb(data, raw=False)
+
+
+def available_protocols() -> list:
+    """WebSocket protocols this server can speak"""
+    protocols = [PROTOCOL_JSON]
+    if msgpack is not None:
+        protocols.append(PROTOCOL_MSGPACK)
+    return protocols
+
+
+class EncodedMessage:
+    """
+    A WebSocket payload encoded at most once per protocol
+
+    Broadcasting the same EncodedMessage to many clients reuses the encoded
+    frame instead of re-serializing the dict for every connection.
+    """
+
+    __slots__ = ("payload", "_text", "_binary")
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self._text = None
+        self._binary = None
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = dumps(self.payload).decode("utf-8")
+        return self._text
+
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = packb(self.payload)
+        return self._binary
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
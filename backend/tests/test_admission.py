@@ -0,0 +1,82 @@
+"""
+Admission control: shedding order and latency estimates under a fake clock
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, DegradationLevel  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def controller(clock: FakeClock, concurrency: int = 2) -> AdmissionController:
+    return AdmissionController(slo_ms=1000, max_in_flight=100, concurrency=concurrency, clock=clock)
+
+
+def test_stages_shed_in_order_as_latency_rises():
+    clock = FakeClock()
+    admission = controller(clock)
+    levels = []
+    for latency in (0.1, 0.5, 0.75, 1.0, 1.5):
+        admission.record(0.0, latency, alpha=1.0)
+        levels.append(admission.level())
+
+    assert levels == [
+        DegradationLevel.FULL,
+        DegradationLevel.NO_LLM_COACHING,
+        DegradationLevel.NO_LLM_TONE,
+        DegradationLevel.FAST_CLASSIFIER,
+        DegradationLevel.REJECT,
+    ]
+
+
+def test_slow_message_with_free_slots_stays_full():
+    async def scenario():
+        clock = FakeClock()
+        admission = controller(clock)
+        async with admission.admit():
+            # Far past the SLO, but the other slot is free
+            clock.now += 10
+            return admission.level()
+
+    assert asyncio.run(scenario()) == DegradationLevel.FULL
+
+
+def test_stall_with_all_slots_busy_raises_pressure():
+    async def scenario():
+        clock = FakeClock()
+        admission = controller(clock, concurrency=1)
+        release = asyncio.Event()
+
+        async def message():
+            async with admission.admit():
+                await release.wait()
+
+        tasks = [asyncio.create_task(message()) for _ in range(2)]
+        await asyncio.sleep(0)  # First message runs, the second waits for its slot
+        levels = [admission.level()]
+        clock.now += 0.6
+        levels.append(admission.level())
+        clock.now += 1.0
+        levels.append(admission.level())
+        release.set()
+        await asyncio.gather(*tasks)
+        return levels
+
+    assert asyncio.run(scenario()) == [
+        DegradationLevel.FULL,
+        DegradationLevel.NO_LLM_COACHING,
+        DegradationLevel.REJECT,
+    ]
@@ -0,0 +1,86 @@
+"""
+Live stats: a client applying snapshot + deltas must end up with the server's counters
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live_stats import LiveStats  # noqa: E402
+from serialization import loads  # noqa: E402
+
+COUNTERS = ("total_messages", "toxic_messages", "clean_messages")
+
+
+def decode(frame: bytes) -> dict:
+    assert frame.startswith(b"data: ")
+    return loads(frame[len(b"data: "):])
+
+
+def apply_delta(stats: dict, delta: dict):
+    """Apply a stats_delta the way StatsPanel does"""
+    changes = delta["changes"]
+    for key in COUNTERS:
+        stats[key] += changes.get(key, 0)
+    for key in ("intents", "tones"):
+        for name, change in changes.get(key, {}).items():
+            stats[key][name] = stats[key].get(name, 0) + change
+            if stats[key][name] <= 0:
+                del stats[key][name]
+    stats["toxicity_rate"] = delta["toxicity_rate"]
+    stats["active_connections"] = delta["active_connections"]
+
+
+def subscribe(live: LiveStats, room_id: str = "*"):
+    """Subscribe and take the initial snapshot, as /api/stats/stream does"""
+    subscription = live.subscribe(room_id)
+    return subscription, decode(live.snapshot_frame(room_id))["stats"]
+
+
+def catch_up(stats: dict, subscription) -> dict:
+    while not subscription.queue.empty():
+        apply_delta(stats, decode(subscription.queue.get_nowait()))
+    return stats
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_subscribe_between_record_and_flush_counts_once():
+    async def scenario():
+        live = LiveStats(interval_ms=1000)
+        live.record("general", False, "question", "polite")
+        # Subscribes before the pending change is pushed
+        subscription, stats = subscribe(live)
+        live.flush()
+        return catch_up(stats, subscription), live.snapshot()
+
+    stats, server = run(scenario())
+    assert stats == server
+    assert stats["total_messages"] == 1
+
+
+def test_clean_delta_sent_when_total_nets_to_zero():
+    async def scenario():
+        live = LiveStats(interval_ms=1000)
+        live.record("general", False, "neutral", "neutral")
+        live.flush()
+        subscription, stats = subscribe(live)
+        # Same interval: a toxic message arrives and the clean one is deleted
+        live.record("general", True, "insult", "rude")
+        live.remove({"room_id": "general", "is_toxic": False, "intent": "neutral", "tone": "neutral"})
+        live.flush()
+        delta = decode(subscription.queue.get_nowait())
+        apply_delta(stats, delta)
+        return delta, stats, live.snapshot()
+
+    delta, stats, server = run(scenario())
+    assert "total_messages" not in delta["changes"]
+    assert delta["changes"]["toxic_messages"] == 1
+    assert delta["changes"]["clean_messages"] == -1
+    assert stats == server
@@ -0,0 +1,61 @@
+"""
+Full-text search: pagination and filters on a temporary SQLite database
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Base, ChatMessage  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+
+def open_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    index = SearchIndex(engine)
+    index.setup()
+    assert index.available
+    return index, sessionmaker(bind=engine)()
+
+
+def add_messages(db, texts, **fields):
+    db.add_all([ChatMessage(username="tester", message=text, **fields) for text in texts])
+    db.commit()
+
+
+def test_inserts_between_pages_do_not_skip_or_repeat_results(tmp_path):
+    index, db = open_db(tmp_path)
+    add_messages(db, [f"you idiot number {i}" for i in range(50)])
+    expected = [message.id for message in db.query(ChatMessage).order_by(ChatMessage.id)]
+
+    seen = []
+    page = index.search(db, "idiot", limit=20)
+    seen += [result["id"] for result in page["results"]]
+    # Changes bm25 statistics for every match and adds results that rank first
+    add_messages(db, ["idiot idiot idiot"] * 300)
+    while page["next_cursor"]:
+        page = index.search(db, "idiot", limit=20, cursor=page["next_cursor"])
+        seen += [result["id"] for result in page["results"]]
+
+    assert sorted(seen) == expected
+    assert len(seen) == len(set(seen))
+
+
+def test_timezone_aware_bounds_are_compared_in_utc(tmp_path):
+    index, db = open_db(tmp_path)
+    add_messages(db, ["what an idiot"], timestamp=datetime(2024, 1, 1, 12, 0))
+
+    # 13:00+02:00 is 11:00 UTC, 14:00+01:00 is 13:00 UTC
+    included = index.search(db, "idiot", start=datetime.fromisoformat("2024-01-01T13:00:00+02:00"))
+    excluded = index.search(db, "idiot", start=datetime.fromisoformat("2024-01-01T14:00:00+01:00"))
+
+    assert included["count"] == 1
+    assert excluded["count"] == 0
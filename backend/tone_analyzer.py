@@ -24,7 +24,7 @@ class ToneAnalyzer:
             self.client = OpenAI(api_key=api_key)
             logger.info("✅ OpenAI client initialized")
     
-    def analyze_tone(self, text: str, toxicity_score: float = 0.0, intent: str = "neutral") -> Dict:
+    def analyze_tone(self, text: str, toxicity_score: float = 0.0, intent: str = "neutral", use_llm: bool = True) -> Dict:
         """
         Analyze tone using OpenAI or fallback to rule-based
         
@@ -32,12 +32,13 @@ class ToneAnalyzer:
             text: Input message
             toxicity_score: Toxicity score from detector
             intent: Classified intent
+            use_llm: Set to False to skip OpenAI (e.g. when the server is degraded)
             
         Returns:
             Dictionary with tone, confidence, and analysis
         """
         # Fallback for no OpenAI key
-        if not self.client:
+        if not self.client or not use_llm:
             return self._fallback_tone_analysis(text, toxicity_score, intent)
         
         try:
@@ -119,10 +120,10 @@ Explanation: [brief explanation]"""
             "explanation": f"Tone classified based on toxicity score ({toxicity_score:.2f}) and intent ({intent})"
         }
     
-    def generate_coaching(self, text: str, tone: str, toxicity_score: float, intent: str) -> str:
+    def generate_coaching(self, text: str, tone: str, toxicity_score: float, intent: str, use_llm: bool = True) -> str:
         """Generate communication coaching message"""
         
-        if not self.client:
+        if not self.client or not use_llm:
             return self._fallback_coaching(tone, toxicity_score, intent)
         
         try:
@@ -166,13 +167,13 @@ Provide brief, constructive coaching (2-3 sentences) on how to communicate more
         else:
             return "Your message is clear. Consider adding context or asking questions to encourage dialogue."
     
-    def suggest_rewrite(self, text: str, tone: str, toxicity_score: float) -> Optional[str]:
+    def suggest_rewrite(self, text: str, tone: str, toxicity_score: float, use_llm: bool = True) -> Optional[str]:
         """Generate a polite rewrite suggestion"""
         
         if toxicity_score < 0.3:
             return None  # Message is already polite
         
-        if not self.client:
+        if not self.client or not use_llm:
             return self._fallback_rewrite(text)
         
         try:
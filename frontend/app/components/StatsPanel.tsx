@@ -1,5 +1,4 @@
 import { useState, useEffect } from 'react'
-import axios from 'axios'
 
 interface Stats {
   total_messages: number
@@ -11,30 +10,56 @@ interface Stats {
   active_connections: number
 }
 
+type StatsChanges = Partial<Pick<Stats, 'total_messages' | 'toxic_messages' | 'clean_messages' | 'intents' | 'tones'>>
+
 interface StatsPanelProps {
   apiUrl: string
 }
 
+const addCounts = (counts: Record<string, number>, changes: Record<string, number> = {}) => {
+  const result = { ...counts }
+  Object.entries(changes).forEach(([key, change]) => {
+    result[key] = (result[key] || 0) + change
+    if (result[key] <= 0) delete result[key]
+  })
+  return result
+}
+
 export default function StatsPanel({ apiUrl }: StatsPanelProps) {
   const [stats, setStats] = useState<Stats | null>(null)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    fetchStats()
-    const interval = setInterval(fetchStats, 5000) // Update every 5 seconds
-    return () => clearInterval(interval)
-  }, [])
-
-  const fetchStats = async () => {
-    try {
-      const response = await axios.get(`${apiUrl}/api/stats`)
-      setStats(response.data)
+    // The server sends a snapshot, then coalesced counter deltas.
+    // EventSource reconnects on its own and receives a fresh snapshot.
+    const source = new EventSource(`${apiUrl}/api/stats/stream`)
+
+    source.onmessage = (event) => {
+      const data = JSON.parse(event.data)
+      if (data.type === 'stats_snapshot') {
+        setStats(data.stats)
+      } else if (data.type === 'stats_delta') {
+        const changes: StatsChanges = data.changes
+        setStats((current) => current && {
+          total_messages: current.total_messages + (changes.total_messages || 0),
+          toxic_messages: current.toxic_messages + (changes.toxic_messages || 0),
+          clean_messages: current.clean_messages + (changes.clean_messages || 0),
+          toxicity_rate: data.toxicity_rate,
+          intents: addCounts(current.intents, changes.intents),
+          tones: addCounts(current.tones, changes.tones),
+          active_connections: data.active_connections,
+        })
+      }
       setLoading(false)
-    } catch (error) {
-      console.error('Failed to fetch stats:', error)
+    }
+
+    source.onerror = (error) => {
+      console.error('Stats stream error:', error)
       setLoading(false)
     }
-  }
+
+    return () => source.close()
+  }, [apiUrl])
 
   if (loading) {
     return (
@@ -141,7 +166,7 @@ export default function StatsPanel({ apiUrl }: StatsPanelProps) {
       )}
 
       <p className="text-xs text-gray-500 mt-4 text-center">
-        Updates every 5 seconds
+        Live updates
       </p>
     </div>
   )